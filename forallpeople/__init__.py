@@ -34,28 +34,38 @@ A module to model the seven SI base units:
 
 __version__ = "2.0.0"
 
+import contextvars
+from fractions import Fraction
 from typing import Union, Optional
 
 
-from forallpeople.dimensions import Dimensions
+from forallpeople.dimensions import Dimensions, rational_exponent
 import forallpeople.physical_helper_functions as phf
 import forallpeople.tuplevector as vec
-from forallpeople.si_environment import Environment
+from forallpeople.si_environment import Environment, _MAX_CACHE_ENTRIES
 import builtins
 import sys
 import warnings
 NUMBER = (int, float)
+EXPONENT = (int, float, Fraction)
+
+# True in a thread or task while si.unchecked() is in effect (see unchecked_mode)
+_unchecked = contextvars.ContextVar("unchecked", default=False)
 
 class Physical(object):
     """
     A class that defines any physical quantity that can be described
     within the BIPM SI unit system.
+
+    An instance holds only its value (in SI base units) and a _UnitDescriptor of
+    its dimensions, factor, precision, and prefix, which is shared by all
+    instances of the same units.
     """
 
     _eps = 1e-7
     _total_precision = 6
 
-    __slots__ = ("value", "dimensions", "factor", "precision", "prefixed")
+    __slots__ = ("value", "_unit")
 
     def __init__(
         self,
@@ -66,16 +76,66 @@ class Physical(object):
         prefixed: str = "",
     ):
         """Constructor"""
-        super(Physical, self).__setattr__("value", value)
-        super(Physical, self).__setattr__("dimensions", dimensions)
-        super(Physical, self).__setattr__("factor", factor)
-        super(Physical, self).__setattr__("precision", precision)
-        super(Physical, self).__setattr__("prefixed", prefixed)
+        _set_value(self, value)
+        _set_unit(self, _unit_descriptor(dimensions, factor, precision, prefixed))
+
+    @classmethod
+    def _new(
+        cls,
+        value: Union[int, float],
+        dimensions: Dimensions,
+        factor: float,
+        precision: int = 3,
+        prefixed: str = "",
+    ):
+        """
+        Returns a new instance with the same arguments as the constructor, without
+        the call to __init__. Used for the results of the internal operations.
+        """
+        physical = _object_new(cls)
+        _set_value(physical, value)
+        _set_unit(physical, _unit_descriptor(dimensions, factor, precision, prefixed))
+        return physical
+
+    @classmethod
+    def _from_unit(cls, value: Union[int, float], unit: "_UnitDescriptor"):
+        """
+        Returns a new instance of 'value' in the units of the _UnitDescriptor,
+        'unit' (e.g. the ._unit of another instance).
+        """
+        physical = _object_new(cls)
+        _set_value(physical, value)
+        _set_unit(physical, unit)
+        return physical
 
     def __setattr__(self, _, __):
         raise AttributeError("Cannot set attribute.")
 
+    def __reduce__(self):
+        """
+        Pickles the instance as its value and its unit descriptor, which is shared
+        by all instances of the same units, so that pickle memoizes it and the unit
+        metadata is written once per pickle instead of once per instance.
+        """
+        return (_physical_from_descriptor, (self.value, self._unit))
+
     ### API Methods ###
+    @property
+    def dimensions(self) -> Dimensions:
+        return self._unit.dimensions
+
+    @property
+    def factor(self) -> float:
+        return self._unit.factor
+
+    @property
+    def precision(self) -> int:
+        return self._unit.precision
+
+    @property
+    def prefixed(self) -> str:
+        return self._unit.prefixed
+
     @property
     def latex(self) -> str:
         return self._repr_latex_()
@@ -91,7 +151,7 @@ class Physical(object):
         if self.factor != 1:
             raise AttributeError("Cannot set a prefix on a Physical if it has a factor.")
         # check if elligible for prefixing; do not rely on __repr__ to ignore it
-        return Physical(
+        return Physical._new(
             self.value, self.dimensions, self.factor, self.precision, prefixed
         )
 
@@ -112,7 +172,7 @@ class Physical(object):
         Returns a new Physical with a new precision, 'n'. Precision controls
         the number of decimal places displayed in repr and str.
         """
-        return Physical(self.value, self.dimensions, self.factor, n, self.prefixed)
+        return Physical._new(self.value, self.dimensions, self.factor, n, self.prefixed)
 
     def split(self, base_value: bool = True) -> tuple:
         """
@@ -127,9 +187,22 @@ class Physical(object):
         if base_value:
             return (
                 self.value * self.factor,
-                Physical(1 / self.factor, self.dimensions, self.factor, self.precision),
+                Physical._new(
+                    1 / self.factor, self.dimensions, self.factor, self.precision
+                ),
             )
-        return (float(self), Physical(1, self.dimensions, self.factor, self.precision))
+        return (
+            float(self),
+            Physical._new(1, self.dimensions, self.factor, self.precision),
+        )
+
+    @classmethod
+    def parse(cls, text: str):
+        """
+        Returns a Physical for the quantity written in 'text', e.g. "12.5 kN/m²",
+        using the units of the active environment (see forallpeople.parsing).
+        """
+        return parse(text)
 
     def sqrt(self, n: float = 2.0):
         """
@@ -147,7 +220,7 @@ class Physical(object):
         env_dims = environment.units_by_dimension
         derived = env_dims["derived"]
         defined = env_dims["defined"]
-        power, dims_orig = phf._powers_of_derived(dims, env_dims)
+        power, dims_orig = environment.powers_of_derived(dims)
         if not unit_name:
             print("Available units: ")
             for key in derived.get(dims_orig, {}):
@@ -161,14 +234,16 @@ class Physical(object):
             unit_match = defined_match or derived_match
             if not unit_match: warnings.warn(f"No unit defined for '{unit_name}''.")
             new_factor = unit_match.get("Factor", 1) ** power
-            return Physical(self.value, self.dimensions, new_factor, self.precision)
+            return Physical._new(
+                self.value, self.dimensions, new_factor, self.precision
+            )
 
     def si(self):
         """
         Return a new Physical instance with self.factor set to 1, thereby returning
         the instance to SI units display.
         """
-        return Physical(self.value, self.dimensions, 1, self.precision)
+        return Physical._new(self.value, self.dimensions, 1, self.precision)
 
     ### repr Methods (the "workhorse" of Physical) ###
 
@@ -190,38 +265,108 @@ class Physical(object):
         instance. The parameter,'template', allows two optional values:
         'html' and 'latex'. which will only be utilized if the Physical
         exists in the Jupyter/iPython environment.
+        The units part of the string is cached in the environment (see
+        ._repr_units() and ._repr_units_string()) and on the instance's
+        _UnitDescriptor, so that only the number needs formatting for Physicals
+        of previously seen units.
         """
         # Access req'd attributes
-        precision = self.precision
-        dims = self.dimensions
-        factor = self.factor
+        unit = self._unit
+        precision = unit.precision
+        dims = unit.dimensions
+        factor = unit.factor
         val = self.value
         prefix = ""
-        prefixed = self.prefixed
-        eps = self._eps
+        prefixed = unit.prefixed
+
+        # Access the units cached on the descriptor for the current environment
+        # (a new unit cache if the environment's repr cache has been cleared)
+        compiled = environment.snapshot()
+        repr_cache = compiled.repr_cache
+        cached = unit.repr_caches.get(compiled)
+        if cached is None or cached[0] is not repr_cache:
+            cached = unit.repr_caches[compiled] = (repr_cache, {})
+        unit_cache = cached[1]
+
+        try:
+            repr_units = unit_cache[template]
+        except KeyError:
+            # Do the expensive unit evaluation (once per dims/factor/template)
+            units_key = (dims._key, factor, template)
+            try:
+                repr_units = repr_cache[units_key]
+            except KeyError:
+                repr_units = self._repr_units(dims, factor, template)
+                if len(repr_cache) < _MAX_CACHE_ENTRIES:
+                    repr_cache[units_key] = repr_units
+            unit_cache[template] = repr_units
+        power, prefix_bool, kg = repr_units[:3]
 
-        # Access external environment
+        # Get the appropriate prefix
+        if prefix_bool and prefixed:
+            prefix = prefixed
+        elif prefix_bool:
+            prefix = phf._auto_prefix(val, power, kg=kg)
+
+        try:
+            units_string = unit_cache[template, prefix]
+        except KeyError:
+            units_string_key = (dims._key, factor, template, prefix)
+            try:
+                units_string = repr_cache[units_string_key]
+            except KeyError:
+                units_string = self._repr_units_string(
+                    repr_units, dims, prefix, template
+                )
+                if len(repr_cache) < _MAX_CACHE_ENTRIES:
+                    repr_cache[units_string_key] = units_string
+            unit_cache[template, prefix] = units_string
+
+        # Determine the appropriate display value
+        value = val * factor
+
+        if prefix_bool:
+            # If the quantity has a "pre-fixed" prefix, it will override
+            # the value generated in _auto_prefix_value
+            value = phf._auto_prefix_value(val, power, prefixed, kg=kg)
+
+        return f"{value:.{precision}f}{units_string}"
+
+    @classmethod
+    def _repr_units(cls, dims: Dimensions, factor: float, template: str) -> tuple:
+        """
+        Returns a tuple of (power, prefix_bool, kg, symbol, exponent) describing
+        how the units of a Physical of 'dims' and 'factor' are represented in
+        the current environment. 'kg' is True if the base dimensions are those of
+        mass and so require the special "kg" case of prefixing.
+        """
         env_fact = environment.units_by_factor or dict()
         env_dims = environment.units_by_dimension or dict()
 
-        # Do the expensive vector math method (call once, only)
-        power, dims_orig = phf._powers_of_derived(dims, env_dims)
+        # Do the expensive vector math method (call once, only; cached in environment)
+        power, dims_orig = environment.powers_of_derived(dims)
 
         # Determine if there is a symbol for these dimensions in the environment
         # and if the quantity is elligible to be prefixed
         symbol, prefix_bool = phf._evaluate_dims_and_factor(
             dims_orig, factor, power, env_fact, env_dims
         )
-        # Get the appropriate prefix
-        if prefix_bool and prefixed:
-            prefix = prefixed
-        elif prefix_bool and dims_orig == Dimensions(1, 0, 0, 0, 0, 0, 0):
-            prefix = phf._auto_prefix(val, power, kg=True)
-        elif prefix_bool:
-            prefix = phf._auto_prefix(val, power, kg=False)
+        kg = dims_orig == Dimensions(1, 0, 0, 0, 0, 0, 0)
 
         # Format the exponent (may not be used, though)
-        exponent = phf._format_exponent(power, repr_format=template, eps=eps)
+        exponent = phf._format_exponent(power, repr_format=template, eps=cls._eps)
+        return (power, prefix_bool, kg, symbol, exponent)
+
+    @staticmethod
+    def _repr_units_string(
+        repr_units: tuple, dims: Dimensions, prefix: str, template: str
+    ) -> str:
+        """
+        Returns the part of the repr that follows the value (i.e. the space,
+        prefix, units, and exponent) for the 'repr_units' tuple generated by
+        ._repr_units().
+        """
+        power, prefix_bool, kg, symbol, exponent = repr_units
 
         # Format the units
         if not symbol and phf._dims_basis_multiple(dims):
@@ -238,17 +383,6 @@ class Physical(object):
         else:
             units = phf._format_symbol(prefix, symbol, repr_format=template)
 
-        # Determine the appropriate display value
-        value = val * factor
-
-        if prefix_bool:
-            # If the quantity has a "pre-fixed" prefix, it will override
-            # the value generated in _auto_prefix_value
-            if dims_orig == Dimensions(1, 0, 0, 0, 0, 0, 0):
-                value = phf._auto_prefix_value(val, power, prefixed, kg=True)
-            else:
-                value = phf._auto_prefix_value(val, power, prefixed)
-
         pre_super = ""
         post_super = ""
         space = " "
@@ -265,7 +399,7 @@ class Physical(object):
             pre_super = ""
             post_super = ""
 
-        return f"{value:.{precision}f}{space}{units}{pre_super}{exponent}{post_super}"
+        return f"{space}{units}{pre_super}{exponent}{post_super}"
 
     ### "Magic" Methods ###
 
@@ -274,8 +408,7 @@ class Physical(object):
         dims = self.dimensions
         factor = self.factor
         prefixed = self.prefixed
-        env_dims = environment.units_by_dimension or dict()
-        power, _ = phf._powers_of_derived(dims, env_dims)
+        power, _ = environment.powers_of_derived(dims)
         if factor != 1:
             float_value = value * factor
         else:
@@ -316,10 +449,14 @@ class Physical(object):
             return round(self.value, phf._total_precision) == other
         elif type(other) == str:
             return False
-        elif isinstance(other, Physical) and self.dimensions == other.dimensions:
+        elif isinstance(other, Physical) and (
+            _same_dimensions(self, other) or _unchecked.get()
+        ):
             return round(self.value, phf._total_precision) == round(
                 other.value, phf._total_precision
             )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             raise ValueError(
                 "Can only compare between Physical instances of equal dimension."
@@ -328,10 +465,14 @@ class Physical(object):
     def __gt__(self, other):
         if isinstance(other, NUMBER):
             return round(self.value, phf._total_precision) > other
-        elif isinstance(other, Physical) and self.dimensions == other.dimensions:
+        elif isinstance(other, Physical) and (
+            _same_dimensions(self, other) or _unchecked.get()
+        ):
             return round(self.value, phf._total_precision) > round(
                 other.value, phf._total_precision
             )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             raise ValueError(
                 "Can only compare between Physical instances of equal dimension."
@@ -340,10 +481,14 @@ class Physical(object):
     def __ge__(self, other):
         if isinstance(other, NUMBER):
             return round(self.value, phf._total_precision) >= other
-        elif isinstance(other, Physical) and self.dimensions == other.dimensions:
+        elif isinstance(other, Physical) and (
+            _same_dimensions(self, other) or _unchecked.get()
+        ):
             return round(self.value, phf._total_precision) >= round(
                 other.value, phf._total_precision
             )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             raise ValueError(
                 "Can only compare between Physical instances of equal dimension."
@@ -352,10 +497,14 @@ class Physical(object):
     def __lt__(self, other):
         if isinstance(other, NUMBER):
             return round(self.value, phf._total_precision) < other
-        elif isinstance(other, Physical) and self.dimensions == other.dimensions:
+        elif isinstance(other, Physical) and (
+            _same_dimensions(self, other) or _unchecked.get()
+        ):
             return round(self.value, phf._total_precision) < round(
                 other.value, phf._total_precision
             )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             raise ValueError(
                 "Can only compare between Physical instances of equal dimension."
@@ -364,10 +513,14 @@ class Physical(object):
     def __le__(self, other):
         if isinstance(other, NUMBER):
             return round(self.value, phf._total_precision) <= other
-        elif isinstance(other, Physical) and self.dimensions == other.dimensions:
+        elif isinstance(other, Physical) and (
+            _same_dimensions(self, other) or _unchecked.get()
+        ):
             return round(self.value, phf._total_precision) <= round(
                 other.value, phf._total_precision
             )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             raise ValueError(
                 "Can only compare between Physical instances of equal dimension."
@@ -375,15 +528,14 @@ class Physical(object):
 
     def __add__(self, other):
         if isinstance(other, Physical):
-            if self.dimensions == other.dimensions:
+            unit = self._unit
+            if (
+                unit is other._unit
+                or unit.dimensions == other._unit.dimensions
+                or _unchecked.get()
+            ):
                 try:
-                    return Physical(
-                        self.value + other.value,
-                        self.dimensions,
-                        self.factor,
-                        self.precision,
-                        self.prefixed,
-                    )
+                    return Physical._from_unit(self.value + other.value, unit)
                 except:
                     raise ValueError(
                         f"Cannot add between {self} and {other}: "
@@ -394,16 +546,13 @@ class Physical(object):
                     f"Cannot add between {self} and {other}: "
                     + ".dimensions attributes are incompatible (not equal)"
                 )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             try:
-                other = other / self.factor
-                return Physical(
-                    self.value + other,
-                    self.dimensions,
-                    self.factor,
-                    self.precision,
-                    self.prefixed,
-                )
+                unit = self._unit
+                other = other / unit.factor
+                return Physical._from_unit(self.value + other, unit)
             except:
                 raise ValueError(
                     f"Cannot add between {self} and {other}: "
@@ -421,15 +570,14 @@ class Physical(object):
 
     def __sub__(self, other):
         if isinstance(other, Physical):
-            if self.dimensions == other.dimensions:
+            unit = self._unit
+            if (
+                unit is other._unit
+                or unit.dimensions == other._unit.dimensions
+                or _unchecked.get()
+            ):
                 try:
-                    return Physical(
-                        self.value - other.value,
-                        self.dimensions,
-                        self.factor,
-                        self.precision,
-                        self.prefixed,
-                    )
+                    return Physical._from_unit(self.value - other.value, unit)
                 except:
                     raise ValueError(f"Cannot subtract between {self} and {other}")
             else:
@@ -437,16 +585,13 @@ class Physical(object):
                     f"Cannot subtract between {self} and {other}:"
                     + ".dimensions attributes are incompatible (not equal)"
                 )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             try:
-                other = other / self.factor
-                return Physical(
-                    self.value - other,
-                    self.dimensions,
-                    self.factor,
-                    self.precision,
-                    self.prefixed,
-                )
+                unit = self._unit
+                other = other / unit.factor
+                return Physical._from_unit(self.value - other, unit)
             except:
                 raise ValueError(
                     f"Cannot subtract between {self} and {other}: "
@@ -456,16 +601,13 @@ class Physical(object):
     def __rsub__(self, other):
         if isinstance(other, Physical):
             return self.__sub__(other)
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             try:
-                other = other / self.factor
-                return Physical(
-                    other - self.value,
-                    self.dimensions,
-                    self.factor,
-                    self.precision,
-                    self.prefixed,
-                )
+                unit = self._unit
+                other = other / unit.factor
+                return Physical._from_unit(other - self.value, unit)
             except:
                 raise ValueError(
                     f"Cannot subtract between {self} and {other}: "
@@ -480,20 +622,24 @@ class Physical(object):
 
     def __mul__(self, other):
         if isinstance(other, NUMBER):
-            return Physical(
-                self.value * other,
-                self.dimensions,
-                self.factor,
-                self.precision,
-                self.prefixed,
-            )
+            return Physical._from_unit(self.value * other, self._unit)
 
         elif isinstance(other, Physical):
-            new_dims = vec.add(self.dimensions, other.dimensions)
-            new_power, new_dims_orig = phf._powers_of_derived(
-                new_dims, environment.units_by_dimension
-            )
-            new_factor = self.factor * other.factor
+            unit, other_unit = self._unit, other._unit
+            # Units of results cached by si.unchecked() (see unchecked_mode)
+            cached_units = environment.snapshot().unchecked_cache
+            key = ("*", unit, other_unit)
+            if key in cached_units:
+                new_unit = cached_units[key]
+                new_value = self.value * other.value
+                if new_unit is None:
+                    return new_value
+                return Physical._from_unit(new_value, new_unit)
+            if _unchecked.get():
+                return _unchecked_result("*", self, other)
+            new_dims = unit.dimensions.add(other_unit.dimensions)
+            new_power, new_dims_orig = environment.powers_of_derived(new_dims)
+            new_factor = unit.factor * other_unit.factor
             test_factor = phf._get_units_by_factor(
                 new_factor, new_dims_orig, environment.units_by_factor, new_power
             )
@@ -509,10 +655,12 @@ class Physical(object):
             if new_dims == Dimensions(0, 0, 0, 0, 0, 0, 0):
                 return new_value
             else:
-                return Physical(new_value, new_dims, new_factor, self.precision)
+                return Physical._new(new_value, new_dims, new_factor, unit.precision)
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             try:
-                return Physical(
+                return Physical._new(
                     self.value * other, self.dimensions, self.factor, self.precision
                 )
             except:
@@ -532,19 +680,23 @@ class Physical(object):
 
     def __truediv__(self, other):
         if isinstance(other, NUMBER):
-            return Physical(
-                self.value / other,
-                self.dimensions,
-                self.factor,
-                self.precision,
-                self.prefixed,
-            )
+            return Physical._from_unit(self.value / other, self._unit)
         elif isinstance(other, Physical):
-            new_dims = vec.subtract(self.dimensions, other.dimensions)
-            new_power, new_dims_orig = phf._powers_of_derived(
-                new_dims, environment.units_by_dimension
-            )
-            new_factor = self.factor / other.factor
+            unit, other_unit = self._unit, other._unit
+            # Units of results cached by si.unchecked() (see unchecked_mode)
+            cached_units = environment.snapshot().unchecked_cache
+            key = ("/", unit, other_unit)
+            if key in cached_units:
+                new_unit = cached_units[key]
+                new_value = self.value / other.value
+                if new_unit is None:
+                    return new_value
+                return Physical._from_unit(new_value, new_unit)
+            if _unchecked.get():
+                return _unchecked_result("/", self, other)
+            new_dims = unit.dimensions.subtract(other_unit.dimensions)
+            new_power, new_dims_orig = environment.powers_of_derived(new_dims)
+            new_factor = unit.factor / other_unit.factor
             if not phf._get_units_by_factor(
                 new_factor, new_dims_orig, environment.units_by_factor, new_power
             ):
@@ -559,10 +711,12 @@ class Physical(object):
             if new_dims == Dimensions(0, 0, 0, 0, 0, 0, 0):
                 return new_value
             else:
-                return Physical(new_value, new_dims, new_factor, self.precision)
+                return Physical._new(new_value, new_dims, new_factor, unit.precision)
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             try:
-                return Physical(
+                return Physical._new(
                     self.value / other, self.dimensions, self.factor, self.precision
                 )
             except:
@@ -574,19 +728,21 @@ class Physical(object):
     def __rtruediv__(self, other):
         if isinstance(other, NUMBER):
             new_value = other / self.value
-            new_dimensions = vec.multiply(self.dimensions, -1)
+            new_dimensions = self.dimensions.multiply(-1)
             new_factor = self.factor ** -1  # added new_factor
-            return Physical(
+            return Physical._new(
                 new_value,
                 new_dimensions,
                 new_factor,  # updated from self.factor to new_factor
                 self.precision,
             )
+        elif isinstance(other, _ARRAY_TYPES):
+            return NotImplemented
         else:
             try:
-                return Physical(
+                return Physical._new(
                     other / self.value,
-                    vec.multiply(self.dimensions, -1),
+                    self.dimensions.multiply(-1),
                     self.factor ** -1,  # updated to ** -1
                     self.precision,
                 )
@@ -602,14 +758,27 @@ class Physical(object):
             + " Use 'a = a / b' to make the operation explicit."
         )
 
+    ### numpy Protocols ###
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        return _array_ufunc(ufunc, method, inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        return _array_function(func, types, args, kwargs)
+
     def __pow__(self, other):
-        if isinstance(other, NUMBER):
+        if isinstance(other, EXPONENT):
             if self.prefixed:
                 return float(self) ** other
+            exponent = other
+            if phf._rational_exponents or type(other) is Fraction:
+                exponent = rational_exponent(other)
+                if type(other) is Fraction:
+                    other = float(other)
             new_value = self.value ** other
-            new_dimensions = vec.multiply(self.dimensions, other)
+            new_dimensions = self.dimensions.multiply(exponent)
             new_factor = self.factor ** other
-            return Physical(new_value, new_dimensions, new_factor, self.precision)
+            return Physical._new(new_value, new_dimensions, new_factor, self.precision)
         else:
             raise ValueError(
                 "Cannot raise a Physical to the power of \
@@ -619,6 +788,94 @@ class Physical(object):
             )
 
 
+class _UnitDescriptor(object):
+    """
+    A class that defines the units of Physical instances: their 'dimensions',
+    'factor', 'precision' and 'prefixed' (see Physical). Instances are created
+    by _unit_descriptor(), which interns them, so all Physicals of the same units
+    share one; like Physicals, they are immutable. The descriptor also caches
+    the units part of the repr of its Physicals for each environment
+    ('repr_caches': {CompiledEnvironment: (environment repr cache, cache)}).
+    """
+
+    __slots__ = ("dimensions", "factor", "precision", "prefixed", "repr_caches")
+
+    def __init__(
+        self, dimensions: Dimensions, factor: float, precision: int, prefixed: str
+    ):
+        set_slot = super(_UnitDescriptor, self).__setattr__
+        set_slot("dimensions", dimensions)
+        set_slot("factor", factor)
+        set_slot("precision", precision)
+        set_slot("prefixed", prefixed)
+        set_slot("repr_caches", {})
+
+    def __setattr__(self, _, __):
+        raise AttributeError("Cannot set attribute.")
+
+    def __reduce__(self):
+        return (
+            _unit_descriptor,
+            (self.dimensions, self.factor, self.precision, self.prefixed),
+        )
+
+    def __repr__(self):
+        return (
+            f"_UnitDescriptor({self.dimensions}, factor={self.factor}, "
+            + f"precision={self.precision}, prefixed='{self.prefixed}')"
+        )
+
+
+def _same_dimensions(physical: Physical, other: Physical) -> bool:
+    """
+    Returns True if the Physicals, 'physical' and 'other', have equal dimensions.
+    """
+    unit, other_unit = physical._unit, other._unit
+    if unit is other_unit:
+        return True
+    dims, other_dims = unit.dimensions, other_unit.dimensions
+    return dims is other_dims or dims == other_dims
+
+
+# The slot descriptors of Physical, which set the slots without going through
+# Physical.__setattr__ (which raises because instances are immutable)
+_object_new = object.__new__
+_set_value = Physical.value.__set__
+_set_unit = Physical._unit.__set__
+
+# Interned _UnitDescriptors. Past _MAX_UNIT_DESCRIPTORS (e.g. if factors are
+# computed from arbitrary values), new descriptors are no longer interned.
+_unit_descriptors = {}
+_MAX_UNIT_DESCRIPTORS = 10000
+
+
+def _unit_descriptor(
+    dimensions: Dimensions, factor: float, precision: int, prefixed: str
+) -> _UnitDescriptor:
+    """
+    Returns the _UnitDescriptor of a Physical's units. The same descriptor is
+    returned for equal units.
+    """
+    key = (dimensions._key, factor, type(factor), precision, prefixed)
+    try:
+        return _unit_descriptors[key]
+    except KeyError:
+        descriptor = _UnitDescriptor(dimensions, factor, precision, prefixed)
+        if len(_unit_descriptors) < _MAX_UNIT_DESCRIPTORS:
+            _unit_descriptors[key] = descriptor
+        return descriptor
+
+
+def _physical_from_descriptor(value: Union[int, float], descriptor: _UnitDescriptor):
+    """
+    Returns a Physical of 'value' in the units of 'descriptor' (see
+    _unit_descriptor). Used to unpickle Physical instances.
+    """
+    if isinstance(descriptor, tuple):  # Pickled by an earlier version
+        return Physical._new(value, *descriptor)
+    return Physical._from_unit(value, descriptor)
+
+
 # The seven SI base units...
 _the_si_base_units = {
     "kg": Physical(1, Dimensions(1, 0, 0, 0, 0, 0, 0), 1.0),
@@ -632,4 +889,40 @@ _the_si_base_units = {
 
 environment = Environment(Physical, builtins, _the_si_base_units)
 environment.push_vars(_the_si_base_units, sys.modules[__name__])
+using = environment.using
+
+
+def rational_exponents(enabled: bool = True) -> None:
+    """
+    Returns None. Switches the rational exponent mode on (or off if 'enabled'
+    is False). In this mode, a Physical raised to a fractional power (including
+    .sqrt()) gets exact Fraction exponents in its Dimensions (e.g. 1/3 instead of
+    0.333...) so that the exponents add back up to whole numbers exactly and the
+    Dimensions are found in the environment without float error. Raising to a
+    Fraction is always exact.
+    """
+    phf._rational_exponents = enabled
+
+
+def __getattr__(name: str):
+    """
+    Returns the unit, 'name', from the environment loaded with lazy=True.
+    """
+    return environment.lazy_unit(name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(environment.lazy_units()))
+
 
+from forallpeople.physical_array import (
+    PhysicalArray,
+    _ARRAY_TYPES,
+    _array_ufunc,
+    _array_function,
+)
+from forallpeople.profiling import profile, profiler
+from forallpeople.parsing import parse, parse_column
+from forallpeople.comparisons import argsort, isclose, sort_key, sort_physicals
+from forallpeople.unchecked_mode import unchecked, _unchecked_result
+from forallpeople.compiler import CompiledFormula, compile_formula
@@ -0,0 +1,269 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Micro-benchmarks of the Physical hot paths, run against each bundled
+environment:
+
+    $ python -m forallpeople.bench [--env structural] [--json results.json]
+                                   [--compare old_results.json]
+
+For each case, reports the operations per second (best of several repeats)
+and the memory allocated per call as traced by tracemalloc: the peak of
+temporary allocations ("alloc") and what is still held afterwards ("kept",
+e.g. cache entries). Results exported with --json can be passed to --compare
+on another version to print the speed-up of each case.
+"""
+
+import argparse
+import functools
+import json
+import pathlib
+import platform
+import sys
+import timeit
+import tracemalloc
+from typing import Callable, Optional
+
+import forallpeople as si
+from forallpeople import Physical
+from forallpeople.dimensions import Dimensions
+import forallpeople.tuplevector as vec
+
+REPEAT = 5
+
+
+def bundled_environments() -> list:
+    """
+    Returns a list of the names of the environment JSON files bundled with
+    forallpeople.
+    """
+    package_dir = pathlib.Path(si.__file__).parent
+    return sorted(path.stem for path in package_dir.glob("*.json"))
+
+
+def environment_cases(env_name: str) -> dict:
+    """
+    Returns a dict of {case_name: callable} that exercise Physical with the
+    environment, 'env_name', loaded. The environment is loaded as a side effect.
+    """
+    environment = si.environment
+    environment(env_name)
+
+    force = Physical(1500.0, Dimensions(1, 1, -2, 0, 0, 0, 0), 1)
+    other_force = Physical(2500.0, Dimensions(1, 1, -2, 0, 0, 0, 0), 1)
+    length = Physical(3.0, Dimensions(0, 1, 0, 0, 0, 0, 0), 1)
+    area = length * length
+    stress = force / area
+    dims = Dimensions(1, 1, -2, 0, 0, 0, 0)
+
+    def load_cold():
+        environment._compiled.pop(env_name, None)
+        environment(env_name)
+
+    cases = {
+        "Physical()": lambda: Physical(1500.0, dims, 1),
+        "+": lambda: force + other_force,
+        "-": lambda: force - other_force,
+        "* (reduced)": lambda: force * length,
+        "/ (reduced)": lambda: force / area,
+        "**": lambda: length ** 2,
+        "<": lambda: force < other_force,
+        "==": lambda: force == other_force,
+        "float()": lambda: float(stress),
+        "repr()": lambda: repr(stress),
+        "_repr_html_()": stress._repr_html_,
+        "_repr_latex_()": stress._repr_latex_,
+    }
+
+    unit_name, unit_dims = _first_unit(environment.units_by_dimension)
+    if unit_name:
+        quantity = Physical(10.0, unit_dims, 1)
+        cases[f"to('{unit_name}')"] = lambda: quantity.to(unit_name)
+
+    cases["environment() (loaded)"] = lambda: environment(env_name)
+    cases["environment() (compile)"] = load_cold
+    return cases
+
+
+def dimensions_cases() -> dict:
+    """
+    Returns a dict of {case_name: callable} that compare the checked tuplevector
+    functions to the unchecked Dimensions methods used in the hot paths.
+    """
+    d1 = Dimensions(1, 1, -2, 0, 0, 0, 0)
+    d2 = Dimensions(0, 1, 0, 0, 0, 0, 0)
+    return {
+        "Dimensions()": lambda: Dimensions(1, 1, -2, 0, 0, 0, 0),
+        "vec.add": lambda: vec.add(d1, d2),
+        "Dimensions.add": lambda: d1.add(d2),
+        "vec.divide": lambda: vec.divide(d1, d2, ignore_zeros=True),
+        "Dimensions.divide": lambda: d1.divide(d2, ignore_zeros=True),
+    }
+
+
+def _first_unit(units_by_dimension: dict) -> tuple:
+    """
+    Returns a tuple of (unit_name, dimensions) for the first unit with a factor
+    in 'units_by_dimension' (or the first derived unit if there are none).
+    Returns (None, None) if there are no units.
+    """
+    for kind in ("defined", "derived"):
+        for dims, units in units_by_dimension.get(kind, {}).items():
+            for unit_name in units:
+                return unit_name, dims
+    return None, None
+
+
+def time_case(func: Callable, min_time: float = 0.05) -> float:
+    """
+    Returns the number of calls of 'func' per second: the best of REPEAT runs that
+    each take at least 'min_time' seconds.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return number / min(timer.repeat(repeat=REPEAT, number=number))
+
+
+def trace_case(func: Callable, calls: int = 100) -> tuple:
+    """
+    Returns a tuple of (alloc_bytes, kept_bytes): the peak memory allocated while
+    calling 'func' once and the memory still allocated per call after 'calls'
+    calls, as traced by tracemalloc.
+    """
+    func()  # Fill any caches first
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        for _ in range(calls - 1):
+            func()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - start, (current - start) // calls
+
+
+def run(env_names: list, min_time: float = 0.05) -> dict:
+    """
+    Returns a dict of the benchmark results for the environments, 'env_names',
+    and the Dimensions cases, suitable for exporting to JSON.
+    """
+    environment = si.environment
+    cache_dir = environment.cache_dir
+    environment.cache_dir = None  # Time compiling from JSON, not from a cache file
+    groups = [("dimensions", dimensions_cases)]
+    groups += [
+        (env_name, functools.partial(environment_cases, env_name))
+        for env_name in env_names
+    ]
+    results = []
+    try:
+        for group_name, make_cases in groups:
+            for case_name, func in make_cases().items():
+                alloc_bytes, kept_bytes = trace_case(func)
+                results.append(
+                    {
+                        "environment": group_name,
+                        "case": case_name,
+                        "ops_per_sec": time_case(func, min_time),
+                        "alloc_bytes": alloc_bytes,
+                        "kept_bytes": kept_bytes,
+                    }
+                )
+    finally:
+        environment.cache_dir = cache_dir
+    return {
+        "forallpeople": si.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def format_results(report: dict, baseline: Optional[dict] = None) -> str:
+    """
+    Returns a str table of the results in 'report'. If 'baseline' (a report from a
+    previous run) is given, a column with the speed-up over 'baseline' is added.
+    """
+    previous = {}
+    if baseline:
+        previous = {
+            (result["environment"], result["case"]): result["ops_per_sec"]
+            for result in baseline["results"]
+        }
+    header = (
+        f"{'environment':<18}{'case':<26}{'ops/s':>14}{'µs/op':>10}"
+        f"{'alloc B':>10}{'kept B':>9}"
+    )
+    if baseline:
+        header += f"{'vs ' + baseline.get('forallpeople', '?'):>12}"
+    lines = [header, "-" * len(header)]
+    for result in report["results"]:
+        ops = result["ops_per_sec"]
+        line = (
+            f"{result['environment']:<18}{result['case']:<26}{ops:>14,.0f}"
+            f"{1e6 / ops:>10.2f}{result['alloc_bytes']:>10}{result['kept_bytes']:>9}"
+        )
+        old_ops = previous.get((result["environment"], result["case"]))
+        if old_ops:
+            line += f"{ops / old_ops:>11.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m forallpeople.bench", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        help="environment to benchmark (may be repeated; default: all bundled)",
+    )
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument(
+        "--compare", help="JSON file of previous results to compare against"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="minimum seconds per timing repeat (default: 0.05)",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    report = run(args.env or bundled_environments(), args.min_time)
+    print(
+        f"forallpeople {report['forallpeople']}, {report['implementation']} "
+        f"{report['python']}, {report['platform']}\n"
+    )
+    print(format_results(report, baseline))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,241 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Comparisons of whole collections of Physical instances. The comparison
+operators of Physical round both sides to Physical._total_precision and check
+the dimensions on every call, which a sort repeats O(n log n) times. The
+functions here check the dimensions once per collection and compare the
+rounded values (the "sort keys") in bulk, giving the same results as the
+operators. They accept lists (or any iterable) of Physicals as well as
+PhysicalArrays and pandas "physical[...]" arrays.
+"""
+
+import math
+from typing import Iterable, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from forallpeople import Physical, NUMBER
+from forallpeople.physical_array import PhysicalArray
+import forallpeople.physical_helper_functions as phf
+
+
+def sort_key(physical: Union[Physical, float]) -> float:
+    """
+    Returns the value that 'physical' is compared by: its value in SI base units
+    rounded to Physical._total_precision (or 'physical' itself if it is a
+    number). Can be used as the 'key' of list.sort(), min(), etc. but does not
+    check the dimensions.
+    """
+    if isinstance(physical, Physical):
+        return round(physical.value, phf._total_precision)
+    return physical
+
+
+def sort_keys(physicals: Iterable) -> list:
+    """
+    Returns a list of the sort keys (see sort_key()) of 'physicals'. Raises
+    ValueError if the Physical instances are not all of the same dimensions or if
+    there is an item that is neither a Physical nor a number.
+    """
+    precision = phf._total_precision
+    dims = None
+    keys = []
+    append = keys.append
+    for physical in physicals:
+        if isinstance(physical, Physical):
+            physical_dims = physical.dimensions
+            if physical_dims is not dims:
+                if dims is None:
+                    dims = physical_dims
+                elif physical_dims != dims:
+                    raise ValueError(
+                        "Can only compare between Physical instances of equal "
+                        + f"dimension: {dims} and {physical_dims}."
+                    )
+            append(round(physical.value, precision))
+        elif isinstance(physical, NUMBER):
+            append(physical)
+        else:
+            raise ValueError(
+                f"Can only compare Physical instances and numbers, not {physical!r}."
+            )
+    return keys
+
+
+def sort_physicals(physicals: Iterable, *, key=None, reverse: bool = False):
+    """
+    Returns the items of 'physicals' in ascending order (descending if 'reverse'
+    is True), like the builtin sorted() but with the dimensions checked once and
+    each item rounded once instead of on every comparison. The sort is stable.
+    PhysicalArrays (1-d) and pandas "physical[...]" arrays are returned as the
+    same type; other iterables are returned as a list. With 'key', or if there
+    are no Physical instances, this is the builtin sorted().
+    """
+    if _is_array(physicals):
+        return physicals[argsort(physicals, reverse=reverse)]
+    items = list(physicals)
+    if key is not None or not any(isinstance(item, Physical) for item in items):
+        return sorted(items, key=key, reverse=reverse)
+    keys = sort_keys(items)
+    order = sorted(range(len(items)), key=keys.__getitem__, reverse=reverse)
+    return [items[index] for index in order]
+
+
+def argsort(physicals: Iterable, reverse: bool = False):
+    """
+    Returns the indices that sort 'physicals' (see sort_physicals()): an int numpy array
+    if 'physicals' is a PhysicalArray or pandas "physical[...]" array, else a list.
+    """
+    if _is_array(physicals):
+        keys = np.round(_array_values(physicals), phf._total_precision)
+        if reverse:
+            keys = -keys
+        return np.argsort(keys, kind="stable")
+    keys = sort_keys(physicals)
+    return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+
+def isclose(
+    a,
+    b,
+    rel_tol: float = 0.0,
+    abs_tol: Union[Physical, float, None] = None,
+):
+    """
+    Returns True where 'a' and 'b' are equal: where their values, rounded to
+    Physical._total_precision, are equal (as with ==), or, if 'rel_tol' or
+    'abs_tol' is given, where they are within the tolerances as in
+    math.isclose(). 'abs_tol' may be a Physical of the same dimensions or a
+    number in SI base units.
+
+    'a' and 'b' may each be a Physical, a number, a sequence of them, a
+    PhysicalArray, or a pandas "physical[...]" array. A single value is compared
+    with every item of the other. Returns a bool if both are single values, a bool
+    numpy array if either is an array, else a list of bools. Raises ValueError if
+    the dimensions differ.
+    """
+    dims_a, values_a = _values(a)
+    dims_b, values_b = _values(b)
+    dims = _common_dimensions(dims_a, dims_b)
+    if isinstance(abs_tol, Physical):
+        _common_dimensions(dims, abs_tol.dimensions)
+        abs_tol = abs_tol.value
+    tolerance = rel_tol or abs_tol
+    precision = phf._total_precision
+    abs_tol = abs_tol or 0.0
+
+    if isinstance(values_a, list) or isinstance(values_b, list):
+        if not isinstance(values_a, list):
+            values_a = [values_a] * len(values_b)
+        elif not isinstance(values_b, list):
+            values_b = [values_b] * len(values_a)
+        elif len(values_a) != len(values_b):
+            raise ValueError(
+                f"Cannot compare sequences of length {len(values_a)} and "
+                + f"{len(values_b)}."
+            )
+        if tolerance:
+            return [
+                math.isclose(x, y, rel_tol=rel_tol, abs_tol=abs_tol)
+                for x, y in zip(values_a, values_b)
+            ]
+        return [
+            round(x, precision) == round(y, precision)
+            for x, y in zip(values_a, values_b)
+        ]
+
+    if np is not None and (
+        isinstance(values_a, np.ndarray) or isinstance(values_b, np.ndarray)
+    ):
+        if tolerance:
+            largest = np.maximum(np.abs(values_a), np.abs(values_b))
+            return np.abs(values_a - values_b) <= np.maximum(
+                rel_tol * largest, abs_tol
+            )
+        return np.round(values_a, precision) == np.round(values_b, precision)
+
+    if tolerance:
+        return math.isclose(values_a, values_b, rel_tol=rel_tol, abs_tol=abs_tol)
+    return round(values_a, precision) == round(values_b, precision)
+
+
+def _is_array(physicals) -> bool:
+    """
+    Returns True if 'physicals' is a PhysicalArray or another array-backed
+    container of Physicals (one with .to_physical_array()).
+    """
+    return isinstance(physicals, PhysicalArray) or hasattr(
+        physicals, "to_physical_array"
+    )
+
+
+def _array_values(physicals):
+    """
+    Returns the numpy array of the values (in SI base units) of the array-backed
+    'physicals'.
+    """
+    if hasattr(physicals, "to_physical_array"):
+        physicals = physicals.to_physical_array()
+    return physicals.value
+
+
+def _values(obj) -> tuple:
+    """
+    Returns a tuple of (dimensions, values) of 'obj' for isclose(): 'dimensions'
+    is None if 'obj' has no Physicals and 'values' is a float, a list of floats,
+    or a numpy array of the values in SI base units.
+    """
+    if isinstance(obj, Physical):
+        return obj.dimensions, obj.value
+    if isinstance(obj, NUMBER):
+        return None, obj
+    if _is_array(obj):
+        if hasattr(obj, "to_physical_array"):
+            obj = obj.to_physical_array()
+        return obj.dimensions, obj.value
+    if np is not None and isinstance(obj, np.ndarray) and obj.dtype.kind in "fiu":
+        return None, obj
+    dims = None
+    values = []
+    for item in obj:
+        if isinstance(item, Physical):
+            dims = _common_dimensions(dims, item.dimensions)
+            values.append(item.value)
+        elif isinstance(item, NUMBER):
+            values.append(item)
+        else:
+            raise ValueError(
+                f"Can only compare Physical instances and numbers, not {item!r}."
+            )
+    return dims, values
+
+
+def _common_dimensions(dims_a, dims_b):
+    """
+    Returns the dimensions shared by 'dims_a' and 'dims_b' (either of which may
+    be None, for numbers). Raises ValueError if they differ.
+    """
+    if dims_a is None or dims_a is dims_b:
+        return dims_b
+    if dims_b is None or dims_a == dims_b:
+        return dims_a
+    raise ValueError(
+        "Can only compare between Physical instances of equal dimension: "
+        + f"{dims_a} and {dims_b}."
+    )
@@ -0,0 +1,237 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+A compiler of formulas that are evaluated many times with the same input
+units:
+
+    moment = si.compile_formula("w * L**2 / 8", w="kN/m", L="m")
+    moment(5, 6)                            # 22.500 kN·m
+    moment(np.array([5, 6]), np.array([6, 7]))  # PhysicalArray
+
+The dimension algebra and unit resolution are done once, when the formula is
+compiled, by evaluating it with Physicals. Each call then only scales the
+inputs to SI base units, evaluates the formula on plain floats (or numpy
+arrays), and wraps the result in the compiled output units.
+"""
+
+import ast
+import math
+from typing import Callable, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from forallpeople import Physical, NUMBER
+from forallpeople.parsing import parse_units
+from forallpeople.physical_array import PhysicalArray
+from forallpeople.si_environment import _FACTOR_OPERATORS, _NUMBER_NODE, _NUMBER_FIELD
+
+# Relative difference allowed between the float kernel and the Physical
+# evaluation of a formula when it is compiled (see _verify())
+_VERIFY_TOLERANCE = 1e-9
+
+# Syntax allowed in a str formula, other than names, numbers and operators
+_EXPRESSION_NODES = (ast.Expression, ast.Load, ast.operator, ast.unaryop)
+
+
+class CompiledFormula(object):
+    """
+    A class that defines a formula compiled by compile_formula(): calling it with the
+    values of its 'inputs' (positionally, in order, or by name) returns the
+    result in the units, 'unit'. Values may be floats or numpy arrays in the
+    input units given to compile_formula(), or Physicals of the input dimensions.
+    'kernel' is the formula on plain floats in SI base units.
+    """
+
+    __slots__ = ("inputs", "kernel", "unit", "_scales", "_dimensions", "_result")
+
+    def __init__(self, inputs: tuple, kernel: Callable, scales: tuple, result):
+        # 'scales' are the Physicals (or floats) of one of each input's units
+        self.inputs = inputs
+        self.kernel = kernel
+        self._scales = tuple(getattr(scale, "value", scale) for scale in scales)
+        self._dimensions = tuple(getattr(scale, "dimensions", None) for scale in scales)
+        self._result = self.unit = None
+        if isinstance(result, Physical):
+            self._result = result._unit
+            self.unit = Physical._from_unit(1 / result.factor, result._unit)
+
+    def __call__(self, *args, **kwargs):
+        if kwargs or len(args) != len(self.inputs):
+            args = self._bind(args, kwargs)
+        values = []
+        for value, scale, dims in zip(args, self._scales, self._dimensions):
+            if type(value) in NUMBER:
+                values.append(value * scale)
+            elif isinstance(value, (Physical, PhysicalArray)):
+                if dims is None or value.dimensions != dims:
+                    raise ValueError(
+                        f"Expected a quantity of {dims}, not {value.dimensions}."
+                    )
+                values.append(value.value)
+            else:
+                values.append(value * scale)
+        result = self.kernel(*values)
+        unit = self._result
+        if unit is None:
+            return result
+        if type(result) is float or np is None or not np.ndim(result):
+            return Physical._from_unit(float(result), unit)
+        return PhysicalArray(result, unit.dimensions, unit.factor, unit.precision)
+
+    def _bind(self, args: tuple, kwargs: dict) -> list:
+        """
+        Returns a list of the input values in 'args' and 'kwargs' in the order of
+        .inputs. Raises TypeError if any are missing or unexpected.
+        """
+        if len(args) > len(self.inputs):
+            raise TypeError(
+                f"Expected at most {len(self.inputs)} arguments, got {len(args)}."
+            )
+        values = list(args)
+        for name in self.inputs[len(args) :]:
+            try:
+                values.append(kwargs.pop(name))
+            except KeyError:
+                raise TypeError(f"Missing input: '{name}'.") from None
+        if kwargs:
+            raise TypeError(f"Unexpected inputs: {', '.join(kwargs)}.")
+        return values
+
+    def __repr__(self):
+        inputs = ", ".join(self.inputs)
+        units = repr(self.unit).split(" ", 1)[1] if self.unit is not None else "1"
+        return f"CompiledFormula(({inputs}) -> {units})"
+
+
+def compile_formula(formula: Union[str, Callable], **input_units) -> CompiledFormula:
+    """
+    Returns a CompiledFormula of 'formula', either a str expression (e.g.
+    "w * L**2 / 8") or a function, whose inputs have the units in
+    'input_units': {input_name: units}, where 'units' is a unit expression (e.g.
+    "kN/m", see forallpeople.parsing), a Physical (e.g. si.kN / si.m), or None for
+    a dimensionless input. A function is called with its inputs by name.
+
+    A str expression may use the inputs, numbers, unit names of the active
+    environment, parentheses, and the operators + - * / **. A function may do
+    anything that works on both Physicals and floats (or numpy arrays) with the
+    same result; this is checked by evaluating it both ways when it is compiled.
+    Raises ValueError if the formula is dimensionally inconsistent or the checks
+    fail (e.g. if a number is added to a quantity whose units have a factor).
+    """
+    inputs = tuple(input_units)
+    units = tuple(_input_unit(input_units[name]) for name in inputs)
+    if isinstance(formula, str):
+        physical_func, kernel = _compile_expression(formula, inputs)
+    else:
+        physical_func = kernel = _by_name(formula, inputs)
+
+    probes = [1.234567 + 0.345678 * index for index in range(len(inputs))]
+    result = physical_func(*[unit * probe for unit, probe in zip(units, probes)])
+    if not isinstance(result, (Physical,) + NUMBER):
+        raise ValueError(f"The formula, {formula!r}, must return a single value.")
+    _verify(formula, result, kernel, units, probes)
+    return CompiledFormula(inputs, kernel, units, result)
+
+
+def _input_unit(units) -> Union[Physical, float]:
+    """
+    Returns the Physical (or 1.0, if dimensionless) of one of the 'units' of an
+    input to compile_formula().
+    """
+    if units is None:
+        return 1.0
+    if isinstance(units, str):
+        units = parse_units(units)
+    if isinstance(units, Physical):
+        return units
+    if isinstance(units, NUMBER):
+        return float(units)
+    raise ValueError(f"Invalid input units: {units!r}")
+
+
+def _by_name(func: Callable, inputs: tuple) -> Callable:
+    """
+    Returns a function that calls 'func' with its positional arguments passed
+    by the names in 'inputs'.
+    """
+
+    code = getattr(func, "__code__", None)
+    if code is not None and inputs == code.co_varnames[: code.co_argcount]:
+        return func
+
+    def call(*values):
+        return func(**dict(zip(inputs, values)))
+
+    return call
+
+
+def _compile_expression(expression: str, inputs: tuple) -> tuple:
+    """
+    Returns a tuple of two functions of the 'inputs' that evaluate the arithmetic
+    'expression': one in which unit names are Physicals and one in which they are
+    their values in SI base units. Raises ValueError if 'expression' contains
+    anything other than numbers, names, parentheses and + - * / **.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as err:
+        raise ValueError(f"Invalid formula: '{expression}'") from err
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, _NUMBER_NODE):
+            if type(getattr(node, _NUMBER_FIELD)) not in NUMBER:
+                raise ValueError(f"Invalid formula: '{expression}'")
+        elif isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            if type(node.op) not in _FACTOR_OPERATORS:
+                raise ValueError(f"Invalid formula: '{expression}'")
+        elif not isinstance(node, _EXPRESSION_NODES):
+            raise ValueError(f"Invalid formula: '{expression}'")
+
+    physical_names = {"__builtins__": {}}
+    float_names = {"__builtins__": {}}
+    for name in names - set(inputs):
+        unit = parse_units(name)
+        physical_names[name] = unit
+        float_names[name] = unit.value if isinstance(unit, Physical) else unit
+    source = f"lambda {', '.join(inputs)}: ({expression.strip()})"
+    code = compile(source, "<si.compile_formula>", "eval")
+    return eval(code, physical_names), eval(code, float_names)
+
+
+def _verify(formula, result, kernel: Callable, units: tuple, probes: list) -> None:
+    """
+    Returns None. Raises ValueError if 'kernel' evaluated on the SI values of
+    the 'probes' in 'units' differs from 'result', the formula evaluated on
+    Physicals.
+    """
+    si_values = [
+        getattr(unit, "value", unit) * probe for unit, probe in zip(units, probes)
+    ]
+    expected = getattr(result, "value", result)
+    actual = kernel(*si_values)
+    if np is not None and isinstance(actual, np.number):
+        actual = float(actual)
+    if not isinstance(actual, NUMBER) or not math.isclose(
+        actual, expected, rel_tol=_VERIFY_TOLERANCE
+    ):
+        raise ValueError(
+            f"The formula, {formula!r}, does not give the same result on floats "
+            + "in SI base units as on Physicals, so it cannot be compiled."
+        )
@@ -12,13 +12,169 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from typing import NamedTuple
+from fractions import Fraction
+import functools
+from typing import NamedTuple, Iterable, Union
 
-class Dimensions(NamedTuple):
+_PACK_BITS = 16
+_PACK_OFFSET = 1 << (_PACK_BITS - 1)
+
+# The largest denominator of an exponent kept as a Fraction by rational_exponent()
+_MAX_DENOMINATOR = 100
+
+# The interned Dimensions instances: vectors of ints are keyed by their
+# values, any others by their values and the types of their values. Past
+# _MAX_INTERNED instances in either (e.g. from powers of arbitrary floats),
+# new instances are no longer interned.
+_interned_ints = {}
+_interned_other = {}
+_MAX_INTERNED = 10000
+
+
+class _DimensionsTuple(NamedTuple):
     kg: float
     m: float
     s: float
     A: float
     cd: float
     K: float
-    mol: float
\ No newline at end of file
+    mol: float
+
+
+class Dimensions(_DimensionsTuple):
+    """
+    The dimension vector of a Physical: the exponents of each of the seven
+    SI base units.
+
+    Instances are interned: creating a Dimensions equal to one that already
+    exists (with exponents of the same types) returns the existing object, so
+    Physicals of a given dimension usually share one Dimensions and callers
+    can test identity before falling back to equality. Equality and hashing
+    are those of tuple (a Python-level __eq__ is slower than tuple's, which
+    hits the identity shortcut for each interned exponent). Each instance has
+    a ._key that can stand in for the whole vector as a dict key: if all of
+    the exponents are ints, they are packed into a single int; otherwise
+    (e.g. float exponents from Physical.sqrt), ._key is a tuple of the
+    exponents and their types. Unlike the Dimensions themselves, the keys of
+    Dimensions(1, 0, ...) and Dimensions(1.0, 0, ...) are not equal.
+
+    Exponents may be Fractions (see rational_exponent()); whole Fractions are
+    stored as ints so that, e.g., three cube roots of a metre add up to exactly
+    the Dimensions of a metre.
+    """
+
+    def __new__(cls, kg, m, s, A, cd, K, mol):
+        values = (kg, m, s, A, cd, K, mol)
+        types_are_int = (
+            type(kg) is type(m) is type(s) is type(A) is type(cd) is type(K)
+        ) and type(mol) is type(kg) is int
+        if not types_are_int and Fraction in map(type, values):
+            values = tuple(
+                value.numerator
+                if type(value) is Fraction and value.denominator == 1
+                else value
+                for value in values
+            )
+            types_are_int = all(type(value) is int for value in values)
+        if types_are_int:
+            interned = _interned_ints
+            key = values
+        else:
+            interned = _interned_other
+            key = (values, tuple(type(value) for value in values))
+        try:
+            return interned[key]
+        except KeyError:
+            pass
+        dims = tuple.__new__(cls, values)
+        dims._key = _pack(values) if types_are_int else key
+        if len(interned) < _MAX_INTERNED:
+            interned[key] = dims
+        return dims
+
+    @classmethod
+    def _make(cls, iterable: Iterable) -> "Dimensions":
+        return cls(*iterable)
+
+    def __reduce__(self):
+        return (Dimensions, tuple(self))
+
+    # Unchecked element-wise arithmetic for the hot paths in Physical and
+    # physical_helper_functions. Unlike the tuplevector functions, these do no
+    # validation and assume 'other' is a 7-element tuple (or a number for
+    # .multiply()).
+
+    def add(self, other: tuple) -> "Dimensions":
+        """
+        Returns the element-wise sum of 'self' and 'other'.
+        """
+        kg, m, s, A, cd, K, mol = self
+        o_kg, o_m, o_s, o_A, o_cd, o_K, o_mol = other
+        return Dimensions(
+            kg + o_kg, m + o_m, s + o_s, A + o_A, cd + o_cd, K + o_K, mol + o_mol
+        )
+
+    def subtract(self, other: tuple) -> "Dimensions":
+        """
+        Returns the element-wise difference of 'self' and 'other'.
+        """
+        kg, m, s, A, cd, K, mol = self
+        o_kg, o_m, o_s, o_A, o_cd, o_K, o_mol = other
+        return Dimensions(
+            kg - o_kg, m - o_m, s - o_s, A - o_A, cd - o_cd, K - o_K, mol - o_mol
+        )
+
+    def multiply(self, n: float) -> "Dimensions":
+        """
+        Returns 'self' with each element multiplied by the scalar, 'n'.
+        """
+        kg, m, s, A, cd, K, mol = self
+        return Dimensions(kg * n, m * n, s * n, A * n, cd * n, K * n, mol * n)
+
+    def divide(self, other: tuple, ignore_zeros: bool = False) -> "Dimensions":
+        """
+        Returns the element-wise division of 'self' and 'other' with the same
+        rules as tuplevector.divide: x/0 is inf and 0/0 is nan, or 0 if
+        'ignore_zeros' is True.
+        """
+        zero_by_zero = 0 if ignore_zeros else float("nan")
+        inf = float("inf")
+        return Dimensions(
+            *[
+                val / o_val if o_val != 0 else (zero_by_zero if val == 0 else inf)
+                for val, o_val in zip(self, other)
+            ]
+        )
+
+
+@functools.lru_cache(maxsize=256, typed=True)
+def rational_exponent(exponent: Union[int, float, Fraction]) -> Union[int, float]:
+    """
+    Returns 'exponent' as an exact exponent: an int if it is a whole number, a
+    Fraction if it is (to within float error) a fraction with a denominator of
+    at most _MAX_DENOMINATOR (e.g. 1/3 or 2.5), or else 'exponent' unchanged.
+    """
+    if type(exponent) is int:
+        return exponent
+    if not isinstance(exponent, Fraction):
+        fraction = Fraction(exponent).limit_denominator(_MAX_DENOMINATOR)
+        if abs(fraction - exponent) > 1e-9 * max(1, abs(exponent)):
+            return exponent
+        exponent = fraction
+    if exponent.denominator == 1:
+        return exponent.numerator
+    return exponent
+
+
+def _pack(values: tuple) -> Union[int, tuple]:
+    """
+    Returns the int exponents in 'values' packed into a single int if they
+    all fit in _PACK_BITS. Otherwise, returns a tuple of 'values' and their
+    types.
+    """
+    packed = 0
+    for value in values:
+        if not -_PACK_OFFSET <= value < _PACK_OFFSET:
+            return (values, tuple(type(value) for value in values))
+        packed = (packed << _PACK_BITS) | (value + _PACK_OFFSET)
+    return packed
@@ -0,0 +1,307 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Parsing of quantities written as text, e.g. "12.5 kN/m²", into Physical
+instances. Unit expressions are resolved against the names and symbols of the
+active environment and cached per environment, so parsing many values with the
+same units costs one dict lookup each (after the first). parse_column() parses
+columns of such values in chunks into PhysicalArrays.
+"""
+
+from array import array
+from collections import namedtuple
+import csv
+import itertools
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from forallpeople import Physical, environment
+from forallpeople.dimensions import Dimensions
+from forallpeople.physical_array import PhysicalArray
+from forallpeople.si_environment import _MAX_CACHE_ENTRIES
+import forallpeople.physical_helper_functions as phf
+
+ParsedGroup = namedtuple("ParsedGroup", ["rows", "values"])
+
+_number = re.compile(r"\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)\s*")
+
+_unit_token = re.compile(
+    r"""\s*(?:
+      (?P<power>\*\*|\^)\s*(?P<exponent>[+-]?(?:\d+\.?\d*|\.\d+))
+    | (?P<superscript>[⁺⁻]?[⁰¹²³⁴⁵⁶⁷⁸⁹]+)
+    | (?P<operator>[*·⋅/])
+    | (?P<paren>[()])
+    | (?P<one>1)(?![\d.])
+    | (?P<name>°?(?:(?![⁰¹²³⁴⁵⁶⁷⁸⁹])[^\W\d])+)
+    )""",
+    re.VERBOSE,
+)
+
+_from_superscripts = str.maketrans("⁺⁻⁰¹²³⁴⁵⁶⁷⁸⁹", "+-0123456789")
+
+# The gram, which takes prefixes in place of the kilogram
+_gram = Physical(1e-3, Dimensions(1, 0, 0, 0, 0, 0, 0), 1.0)
+
+
+def parse(text: str) -> Union[Physical, float]:
+    """
+    Returns a Physical for 'text', a number followed by a unit expression (e.g.
+    "12.5 kN/m²", "3 kip·ft", "9.81 m/s**2"). Unit names may be the names or
+    symbols of the units in the active environment, SI base units, or prefixed
+    derived units (e.g. "kN", "MPa", "mg"). Units are combined with "*", "·", "/",
+    or a space, raised to powers with "**", "^", or superscripts, and may be
+    grouped with parentheses. Returns a float if there is no unit expression or
+    it is dimensionless. Raises ValueError if 'text' cannot be parsed.
+    """
+    match = _number.match(text)
+    if match is None:
+        raise ValueError(f"No number at the start of '{text}'")
+    value = float(match.group(1))
+    unit_string = text[match.end() :]
+    if not unit_string:
+        return value
+    return value * parse_units(unit_string)
+
+
+def parse_units(unit_string: str) -> Union[Physical, float]:
+    """
+    Returns the Physical (or float, if dimensionless) of the unit expression,
+    'unit_string', in the active environment (see parse()). Results are cached
+    per environment, up to _MAX_CACHE_ENTRIES unit strings.
+    """
+    compiled = environment.snapshot()
+    try:
+        return compiled.parse_cache[unit_string]
+    except KeyError:
+        pass
+    names = compiled.unit_names
+    if names is None:
+        names = compiled.unit_names = _unit_names(compiled)
+    unit = names.get(unit_string.strip())
+    if unit is None:
+        unit = _UnitExpression(unit_string, names).parse()
+    if len(compiled.parse_cache) < _MAX_CACHE_ENTRIES:
+        compiled.parse_cache[unit_string] = unit
+    return unit
+
+
+def parse_column(
+    source: Iterable,
+    column: Optional[int] = None,
+    chunk_size: int = 65536,
+    header: bool = False,
+    delimiter: str = ",",
+) -> Iterator[ParsedGroup]:
+    """
+    Yields a ParsedGroup of (rows, values) for each unit in each chunk of
+    'chunk_size' entries of 'source', an iterable of strings like "3.2 kip" (see
+    parse()). If 'column' is given, 'source' is read as CSV (e.g. an open file)
+    and the entries are taken from that column. The first row is skipped if
+    'header' is True.
+
+    'rows' is an int numpy array of the (0-based) positions of the entries in the
+    group and 'values' is a PhysicalArray of them (or a float numpy array if they
+    are dimensionless), with one Dimensions and factor for the whole group. Only
+    one chunk is held in memory at a time, so files of any size can be streamed.
+    Empty entries are skipped. Raises ValueError if an entry cannot be parsed.
+    Requires numpy.
+    """
+    if np is None:
+        raise ImportError("parse_column requires numpy: pip install numpy")
+    entries = iter(source)
+    if column is not None:
+        entries = (
+            row[column] if len(row) > column else ""
+            for row in csv.reader(entries, delimiter=delimiter)
+        )
+    if header:
+        next(entries, None)
+
+    units = {}  # {unit_string: (group_key, unit, si_value)}
+    row = 0
+    while True:
+        chunk = list(itertools.islice(entries, chunk_size))
+        if not chunk:
+            return
+        groups = {}  # {group_key: (unit, rows, values)}
+        for text in chunk:
+            text = text.strip() if text else ""
+            if text:
+                match = _number.match(text)
+                if match is None:
+                    raise ValueError(f"Row {row}: no number at the start of '{text}'")
+                unit_string = text[match.end() :]
+                try:
+                    group_key, unit, si_value = units[unit_string]
+                except KeyError:
+                    try:
+                        unit = parse_units(unit_string) if unit_string else 1.0
+                    except ValueError as err:
+                        raise ValueError(f"Row {row}: {err}") from err
+                    if isinstance(unit, Physical):
+                        group_key = (unit.dimensions._key, unit.factor)
+                        si_value = unit.value
+                    else:
+                        group_key, si_value = None, unit
+                    units[unit_string] = group_key, unit, si_value
+                try:
+                    _, group_rows, group_values = groups[group_key]
+                except KeyError:
+                    _, group_rows, group_values = groups[group_key] = (
+                        unit,
+                        array("q"),
+                        array("d"),
+                    )
+                group_rows.append(row)
+                group_values.append(float(match.group(1)) * si_value)
+            row += 1
+        for unit, group_rows, group_values in groups.values():
+            values = np.frombuffer(group_values, dtype=np.float64)
+            if isinstance(unit, Physical):
+                values = PhysicalArray(
+                    values, unit.dimensions, unit.factor, unit.precision
+                )
+            yield ParsedGroup(np.frombuffer(group_rows, dtype=np.int64), values)
+
+
+def _unit_names(compiled) -> dict:
+    """
+    Returns a dict of {name: Physical} of the units that can be named in a unit
+    expression in the CompiledEnvironment, 'compiled': its unit names and symbols,
+    the SI base units, and the prefixed SI base and derived units. Earlier
+    entries take precedence.
+    """
+    names = {}
+    prefixable = {"g": _gram}
+    prefixable.update(environment._si_base_units)
+    del prefixable["kg"]
+    for units in compiled.units_by_dimension["derived"].values():
+        for unit_name, definition in units.items():
+            unit = environment._get_unit(compiled, unit_name)
+            prefixable.setdefault(unit_name, unit)
+            prefixable.setdefault(definition.get("Symbol") or unit_name, unit)
+    for prefix, prefix_factor in phf._prefixes.items():
+        if not prefix:
+            continue
+        for unit_name, unit in prefixable.items():
+            names[prefix + unit_name] = unit * prefix_factor
+            if prefix == "μ":
+                names["µ" + unit_name] = names[prefix + unit_name]
+    names.update(prefixable)
+    names.update(environment._si_base_units)
+    for unit_name, definition in compiled.definitions.items():
+        unit = environment._get_unit(compiled, unit_name)
+        names[definition.get("Symbol") or unit_name] = unit
+    for unit_name in compiled.definitions:
+        names[unit_name] = environment._get_unit(compiled, unit_name)
+    return names
+
+
+class _UnitExpression:
+    """
+    A recursive descent parser of a unit expression:
+
+        expression := term (("*" | "·" | "/" | " ") term)*
+        term := ("1" | name | "(" expression ")") [("**" | "^") number | superscript]
+    """
+
+    def __init__(self, unit_string: str, names: dict):
+        self.unit_string = unit_string
+        self.names = names
+        self.tokens = self._tokenize(unit_string)
+        self.position = 0
+
+    def parse(self) -> Union[Physical, float]:
+        result = self._expression()
+        if self._peek() is not None:
+            self._error(f"unexpected '{self._peek()[1]}'")
+        return result
+
+    def _tokenize(self, unit_string: str) -> list:
+        tokens = []
+        position = 0
+        unit_string = unit_string.rstrip()
+        while position < len(unit_string):
+            match = _unit_token.match(unit_string, position)
+            if match is None or match.end() == position:
+                self._error(f"unexpected '{unit_string[position:].strip()}'")
+            kind = match.lastgroup
+            if kind == "exponent":
+                tokens.append(("power", float(match.group("exponent"))))
+            elif kind == "superscript":
+                exponent = match.group(kind).translate(_from_superscripts)
+                tokens.append(("power", float(exponent)))
+            else:
+                tokens.append((kind, match.group(kind)))
+            position = match.end()
+        return tokens
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _expression(self):
+        result = self._term()
+        while True:
+            token = self._peek()
+            if token is None or token == ("paren", ")"):
+                return result
+            if token[0] == "operator":
+                self._next()
+                if token[1] == "/":
+                    result = result / self._term()
+                    continue
+            result = result * self._term()
+
+    def _term(self):
+        token = self._next()
+        if token is None:
+            self._error("missing unit")
+        kind, text = token
+        if kind == "one":
+            result = 1
+        elif kind == "name":
+            try:
+                result = self.names[text]
+            except KeyError:
+                self._error(f"unknown unit '{text}'")
+        elif token == ("paren", "("):
+            result = self._expression()
+            if self._next() != ("paren", ")"):
+                self._error("missing ')'")
+        else:
+            self._error(f"unexpected '{text}'")
+        token = self._peek()
+        if token is not None and token[0] == "power":
+            self._next()
+            exponent = token[1]
+            if exponent.is_integer():
+                exponent = int(exponent)
+            result = result ** exponent
+        return result
+
+    def _error(self, message: str):
+        raise ValueError(f"Cannot parse the units '{self.unit_string}': {message}")
@@ -0,0 +1,708 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+PhysicalArray: many physical quantities of the same units stored as one
+contiguous numpy array of values (in SI base units) with a single
+Dimensions and factor. Requires numpy.
+"""
+
+from fractions import Fraction
+from typing import Union, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from forallpeople import Physical
+from forallpeople.dimensions import Dimensions, rational_exponent
+import forallpeople.physical_helper_functions as phf
+
+NUMBER = (int, float)
+EXPONENT = (int, float, Fraction)
+
+
+class PhysicalArray(object):
+    """
+    A class that defines an array of physical quantities that all share the
+    same dimensions and factor. The values are stored in SI base units in a
+    contiguous float64 numpy array, so arithmetic is performed with numpy
+    ufuncs and the dimension checks and unit reduction of Physical are
+    performed once per operation instead of once per element.
+    """
+
+    _print_threshold = 1000
+    _edge_items = 3
+
+    __slots__ = ("value", "dimensions", "factor", "precision")
+
+    def __init__(
+        self, value, dimensions: Dimensions, factor: float = 1, precision: int = 3,
+    ):
+        """Constructor"""
+        if np is None:
+            raise ImportError("PhysicalArray requires numpy: pip install numpy")
+        super(PhysicalArray, self).__setattr__(
+            "value", np.ascontiguousarray(value, dtype=np.float64)
+        )
+        super(PhysicalArray, self).__setattr__("dimensions", dimensions)
+        super(PhysicalArray, self).__setattr__("factor", factor)
+        super(PhysicalArray, self).__setattr__("precision", precision)
+
+    def __setattr__(self, _, __):
+        raise AttributeError("Cannot set attribute.")
+
+    def __reduce__(self):
+        """
+        Pickles the instance as its numpy array of values and its units. With
+        pickle protocol 5 and a buffer_callback, numpy passes the values as an
+        out-of-band buffer (no copy into the pickle).
+        """
+        return (
+            PhysicalArray,
+            (self.value, self.dimensions, self.factor, self.precision),
+        )
+
+    @classmethod
+    def from_physicals(cls, physicals: Iterable[Physical]):
+        """
+        Returns a PhysicalArray of the Physical instances in 'physicals', which
+        may be any sequence or object-dtype numpy array of Physicals (its shape
+        is kept). The factor and precision are taken from the first instance.
+        Raises ValueError if the instances are not all of the same dimensions.
+        """
+        if np is None:
+            raise ImportError("PhysicalArray requires numpy: pip install numpy")
+        physicals = np.asarray(physicals, dtype=object)
+        if not physicals.size:
+            raise ValueError("Cannot create a PhysicalArray from an empty sequence.")
+        first = physicals.flat[0]
+        dims = first.dimensions
+        for physical in physicals.flat:
+            if not isinstance(physical, Physical) or physical.dimensions != dims:
+                raise ValueError(
+                    "Can only create a PhysicalArray from Physical instances of "
+                    + f"equal dimension: {first} and {physical}."
+                )
+        values = [physical.value for physical in physicals.flat]
+        return cls(
+            np.reshape(values, physicals.shape), dims, first.factor, first.precision
+        )
+
+    @classmethod
+    def from_arrow(cls, array):
+        """
+        Returns a PhysicalArray of the pyarrow array, 'array', of PhysicalArrowType
+        (see forallpeople.physical_arrow.from_arrow). Requires pyarrow.
+        """
+        from forallpeople.physical_arrow import from_arrow
+
+        return from_arrow(array)
+
+    ### API Methods ###
+    def to_arrow(self):
+        """
+        Returns a pyarrow array of PhysicalArrowType of the (flattened) values
+        with the units of 'self' as type metadata (see
+        forallpeople.physical_arrow.to_arrow). Requires pyarrow.
+        """
+        from forallpeople.physical_arrow import to_arrow
+
+        return to_arrow(self)
+
+    @property
+    def unit(self) -> Physical:
+        """
+        Returns a Physical of value 1 (in SI base units) with the dimensions,
+        factor, and precision of 'self'.
+        """
+        return Physical(1, self.dimensions, self.factor, self.precision)
+
+    @property
+    def shape(self) -> tuple:
+        return self.value.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.value.ndim
+
+    @property
+    def size(self) -> int:
+        return self.value.size
+
+    def round(self, n: int):
+        """
+        Returns a new PhysicalArray with a new precision, 'n'.
+        """
+        return PhysicalArray(self.value, self.dimensions, self.factor, n)
+
+    def si(self):
+        """
+        Return a new PhysicalArray with self.factor set to 1.
+        """
+        return PhysicalArray(self.value, self.dimensions, 1, self.precision)
+
+    def to(self, unit_name: str = ""):
+        """
+        Returns a new PhysicalArray with the factor of the unit, 'unit_name',
+        as described in Physical.to().
+        """
+        if not unit_name:
+            return self.unit.to()
+        return PhysicalArray(
+            self.value, self.dimensions, self.unit.to(unit_name).factor, self.precision
+        )
+
+    def tolist(self) -> list:
+        """
+        Returns a (possibly nested) list of Physical instances.
+        """
+        return [
+            item.tolist() if isinstance(item, PhysicalArray) else item for item in self
+        ]
+
+    ### repr Methods ###
+
+    def __repr__(self):
+        return f"PhysicalArray({self._format_items(repr)})"
+
+    def _repr_html_(self):
+        return self._format_items(lambda physical: physical._repr_html_())
+
+    def _repr_latex_(self):
+        return self._format_items(lambda physical: physical._repr_latex_())
+
+    def _format_items(self, formatter) -> str:
+        """
+        Returns the items of 'self' as Physical instances formatted by
+        'formatter' in a (possibly nested and summarized) list.
+        """
+        if self.ndim == 0:
+            return formatter(self._wrap_item(self.value[()]))
+        if len(self) > self._print_threshold:
+            edge = self._edge_items
+            items = [self[idx] for idx in range(edge)]
+            items += [...] + [self[idx] for idx in range(len(self) - edge, len(self))]
+        else:
+            items = list(self)
+        formatted = []
+        for item in items:
+            if item is ...:
+                formatted.append("...")
+            elif isinstance(item, PhysicalArray):
+                formatted.append(item._format_items(formatter))
+            else:
+                formatted.append(formatter(item))
+        return "[" + ", ".join(formatted) + "]"
+
+    ### Container Methods ###
+
+    def __len__(self):
+        return len(self.value)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getitem__(self, key):
+        value = self.value[key]
+        if np.ndim(value) == 0:
+            return self._wrap_item(value)
+        return PhysicalArray(value, self.dimensions, self.factor, self.precision)
+
+    __hash__ = None
+
+    def _wrap_item(self, value) -> Physical:
+        return Physical._new(float(value), self.dimensions, self.factor, self.precision)
+
+    def _new(self, value, unit: Union[Physical, float]):
+        """
+        Returns 'value' in the units of 'unit' (see _wrap).
+        """
+        return _wrap(value, unit)
+
+    ### numpy Protocols ###
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        return _array_ufunc(ufunc, method, inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        return _array_function(func, types, args, kwargs)
+
+    ### Comparison Methods ###
+
+    def _compare(self, other, ufunc):
+        if _is_object_array(other):
+            return NotImplemented
+        values = np.round(self.value, phf._total_precision)
+        if isinstance(other, (Physical, PhysicalArray)):
+            if self.dimensions != other.dimensions:
+                raise ValueError(
+                    "Can only compare between Physical instances of equal dimension."
+                )
+            return ufunc(values, np.round(other.value, phf._total_precision))
+        return ufunc(values, other)
+
+    def __eq__(self, other):
+        return self._compare(other, np.equal)
+
+    def __ne__(self, other):
+        return self._compare(other, np.not_equal)
+
+    def __gt__(self, other):
+        return self._compare(other, np.greater)
+
+    def __ge__(self, other):
+        return self._compare(other, np.greater_equal)
+
+    def __lt__(self, other):
+        return self._compare(other, np.less)
+
+    def __le__(self, other):
+        return self._compare(other, np.less_equal)
+
+    ### Arithmetic Methods ###
+
+    def __neg__(self):
+        return PhysicalArray(
+            np.negative(self.value), self.dimensions, self.factor, self.precision
+        )
+
+    def __abs__(self):
+        return PhysicalArray(
+            np.absolute(self.value), self.dimensions, self.factor, self.precision
+        )
+
+    def _add_or_subtract(self, other, ufunc, reflected: bool = False):
+        if _is_object_array(other):
+            return NotImplemented
+        if isinstance(other, (Physical, PhysicalArray)):
+            if self.dimensions != other.dimensions:
+                raise ValueError(
+                    f"Cannot add or subtract between {self} and {other}: "
+                    + ".dimensions attributes are incompatible (not equal)"
+                )
+            other = other.value
+        else:
+            other = np.divide(other, self.factor)
+        args = (other, self.value) if reflected else (self.value, other)
+        return PhysicalArray(ufunc(*args), self.dimensions, self.factor, self.precision)
+
+    def __add__(self, other):
+        return self._add_or_subtract(other, np.add)
+
+    def __radd__(self, other):
+        return self._add_or_subtract(other, np.add, reflected=True)
+
+    def __sub__(self, other):
+        return self._add_or_subtract(other, np.subtract)
+
+    def __rsub__(self, other):
+        return self._add_or_subtract(other, np.subtract, reflected=True)
+
+    def __mul__(self, other):
+        if _is_object_array(other):
+            return NotImplemented
+        if isinstance(other, (Physical, PhysicalArray)):
+            unit = self.unit * Physical(1, other.dimensions, other.factor)
+            return self._new(np.multiply(self.value, other.value), unit)
+        return PhysicalArray(
+            np.multiply(self.value, other), self.dimensions, self.factor, self.precision
+        )
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        if _is_object_array(other):
+            return NotImplemented
+        if isinstance(other, (Physical, PhysicalArray)):
+            unit = self.unit / Physical(1, other.dimensions, other.factor)
+            return self._new(np.divide(self.value, other.value), unit)
+        return PhysicalArray(
+            np.divide(self.value, other), self.dimensions, self.factor, self.precision
+        )
+
+    def __rtruediv__(self, other):
+        if isinstance(other, Physical):
+            unit = Physical(1, other.dimensions, other.factor, other.precision) / self.unit
+            return self._new(np.divide(other.value, self.value), unit)
+        return PhysicalArray(
+            np.divide(other, self.value),
+            self.dimensions.multiply(-1),
+            self.factor ** -1,
+            self.precision,
+        )
+
+    def __pow__(self, other):
+        if isinstance(other, EXPONENT):
+            exponent = other
+            if phf._rational_exponents or type(other) is Fraction:
+                exponent = rational_exponent(other)
+                if type(other) is Fraction:
+                    other = float(other)
+            return PhysicalArray(
+                np.power(self.value, other),
+                self.dimensions.multiply(exponent),
+                self.factor ** other,
+                self.precision,
+            )
+        raise ValueError(
+            f"Can only raise a PhysicalArray to the power of a number, not {other}"
+        )
+
+    def __iadd__(self, other):
+        raise ValueError(
+            "Cannot incrementally add PhysicalArray instances because they are immutable."
+            + " Use 'a = a + b', to make the operation explicit."
+        )
+
+    def __isub__(self, other):
+        raise ValueError(
+            "Cannot incrementally subtract PhysicalArray instances because they are immutable."
+            + " Use 'a = a - b', to make the operation explicit."
+        )
+
+    def __imul__(self, other):
+        raise ValueError(
+            "Cannot incrementally multiply PhysicalArray instances because they are immutable."
+            + " Use 'a = a * b' to make the operation explicit."
+        )
+
+    def __itruediv__(self, other):
+        raise ValueError(
+            "Cannot incrementally divide PhysicalArray instances because they are immutable."
+            + " Use 'a = a / b' to make the operation explicit."
+        )
+
+
+### numpy dispatch (NEP 13 and NEP 18) ###
+
+# Ufuncs whose result has the units of their (equally dimensioned) inputs
+_SAME_UNITS_BINARY = {"add", "subtract", "maximum", "minimum", "fmax", "fmin", "hypot"}
+_SAME_UNITS_UNARY = {"negative", "positive", "absolute", "fabs", "conjugate"}
+_POWER_UFUNCS = {"sqrt": 0.5, "cbrt": 1 / 3, "square": 2, "reciprocal": -1}
+_COMPARISON_UFUNCS = {
+    "equal",
+    "not_equal",
+    "less",
+    "less_equal",
+    "greater",
+    "greater_equal",
+}
+_UNITLESS_RESULT_UFUNCS = {"isnan", "isinf", "isfinite", "signbit", "sign"}
+_REDUCIBLE_UFUNCS = {"add", "maximum", "minimum", "fmax", "fmin"}
+
+# Operands that Physical operators defer to numpy dispatch for
+_ARRAY_TYPES = (PhysicalArray,) if np is None else (PhysicalArray, np.ndarray)
+
+# numpy functions handled by PhysicalArray.__array_function__, by name
+_ARRAY_FUNCTIONS = {}
+
+
+def _unit_and_value(obj) -> tuple:
+    """
+    Returns a tuple of the unit (a Physical of value 1) and the value of 'obj'.
+    The unit is None if 'obj' is not a Physical or PhysicalArray.
+    """
+    if isinstance(obj, Physical):
+        return Physical._from_unit(1, obj._unit), obj.value
+    if isinstance(obj, PhysicalArray):
+        return Physical(1, obj.dimensions, obj.factor, obj.precision), obj.value
+    return None, obj
+
+
+def _wrap(value, unit: Union[Physical, float, None]):
+    """
+    Returns 'value' as a Physical (if 'value' is a scalar) or a PhysicalArray
+    in the units of 'unit'. If 'unit' is not a Physical (i.e. the units
+    cancelled out or there were none), 'value' is returned unchanged.
+    """
+    if not isinstance(unit, Physical):
+        return value
+    if np.ndim(value) == 0:
+        return Physical._from_unit(float(value), unit._unit)
+    return PhysicalArray(value, unit.dimensions, unit.factor, unit.precision)
+
+
+def _is_object_array(obj) -> bool:
+    """
+    Returns True if 'obj' is an object-dtype numpy array (e.g. an array of
+    Physical instances), whose operations numpy performs element by element.
+    """
+    return isinstance(obj, np.ndarray) and obj.dtype == object
+
+
+def _has_object_array(args) -> bool:
+    """
+    Returns True if any of 'args' (or of the arrays in a list or tuple in 'args')
+    is an object-dtype numpy array.
+    """
+    for arg in args:
+        if isinstance(arg, (list, tuple)) and _has_object_array(arg):
+            return True
+        if _is_object_array(arg):
+            return True
+    return False
+
+
+def _as_object_array(obj):
+    """
+    Returns 'obj' as an object-dtype numpy array of Physicals if it is a
+    Physical or PhysicalArray (recursing into lists and tuples). Otherwise,
+    returns 'obj' unchanged.
+    """
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_as_object_array(item) for item in obj)
+    if isinstance(obj, Physical):
+        array = np.empty((), dtype=object)
+        array[()] = obj
+        return array
+    if isinstance(obj, PhysicalArray):
+        array = np.empty(obj.shape, dtype=object)
+        for index in np.ndindex(obj.shape):
+            array[index] = obj[index]
+        return array
+    return obj
+
+
+def _from_object_arrays(obj):
+    """
+    Returns 'obj' with each object-dtype numpy array in it (recursing into
+    lists and tuples) converted to a PhysicalArray if all of its elements are
+    Physicals of the same dimensions. Other arrays are left as they are.
+    """
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_from_object_arrays(item) for item in obj)
+    if _is_object_array(obj) and obj.size:
+        try:
+            return PhysicalArray.from_physicals(obj)
+        except (ValueError, AttributeError):  # Mixed dimensions or non-Physicals
+            return obj
+    return obj
+
+
+def _check_same_dimensions(units: list, operation: str) -> None:
+    """
+    Returns None. Raises ValueError if the Physical 'units' are not all of the
+    same dimensions.
+    """
+    for unit in units[1:]:
+        if unit.dimensions != units[0].dimensions:
+            raise ValueError(
+                f"Cannot {operation} between {units[0]} and {unit}: "
+                + ".dimensions attributes are incompatible (not equal)"
+            )
+
+
+def _array_ufunc(ufunc, method: str, inputs: tuple, kwargs: dict):
+    """
+    Returns the result of the numpy 'ufunc' called with 'method' on 'inputs'
+    (any of which may be Physical or PhysicalArray instances). The dimensions
+    of the result are worked out once and the ufunc is computed on the raw
+    float values. Returns NotImplemented for unsupported ufuncs or arguments.
+    """
+    if kwargs.get("out") is not None:
+        return NotImplemented
+    if _has_object_array(inputs):
+        # Arrays of Physicals are converted once to use the float values. Any
+        # others (e.g. of mixed dimensions) are left to numpy's object loops,
+        # which call the Physical operators on each element.
+        inputs = _from_object_arrays(inputs)
+        if _has_object_array(inputs):
+            return getattr(ufunc, method)(*_as_object_array(inputs), **kwargs)
+    name = ufunc.__name__
+    units, values = zip(*(_unit_and_value(arg) for arg in inputs))
+    physical_units = [unit for unit in units if unit is not None]
+
+    if method == "reduce" and name in _REDUCIBLE_UFUNCS:
+        return _wrap(ufunc.reduce(values[0], **kwargs), units[0])
+    elif method == "accumulate" and name == "add":
+        return _wrap(ufunc.accumulate(values[0], **kwargs), units[0])
+    elif method != "__call__":
+        return NotImplemented
+
+    if name in _SAME_UNITS_UNARY:
+        return _wrap(ufunc(*values, **kwargs), units[0])
+    elif name in _POWER_UFUNCS:
+        return _wrap(ufunc(*values, **kwargs), units[0] ** _POWER_UFUNCS[name])
+    elif name in _UNITLESS_RESULT_UFUNCS:
+        return ufunc(*values, **kwargs)
+    elif name in _COMPARISON_UFUNCS:
+        _check_same_dimensions(physical_units, "compare")
+        rounded = [np.round(value, phf._total_precision) for value in values]
+        return ufunc(*rounded, **kwargs)
+    elif name in _SAME_UNITS_BINARY:
+        _check_same_dimensions(physical_units, name)
+        unit = physical_units[0]
+        if len(physical_units) != len(inputs) and name not in ("add", "subtract"):
+            return NotImplemented
+        # Plain numbers are taken to be in the units of 'unit', as in Physical.__add__
+        values = [
+            value if arg_unit is not None else np.divide(value, unit.factor)
+            for arg_unit, value in zip(units, values)
+        ]
+        return _wrap(ufunc(*values, **kwargs), unit)
+    elif name in ("multiply", "matmul"):
+        unit_a, unit_b = units
+        unit = unit_a * unit_b if unit_a and unit_b else unit_a or unit_b
+        return _wrap(ufunc(*values, **kwargs), unit)
+    elif name in ("divide", "true_divide"):
+        unit_a, unit_b = units
+        if unit_a and unit_b:
+            unit = unit_a / unit_b
+        elif unit_b:
+            unit = 1 / unit_b
+        else:
+            unit = unit_a
+        return _wrap(ufunc(*values, **kwargs), unit)
+    elif name in ("power", "float_power"):
+        unit, exponent_unit = units
+        if exponent_unit is not None or np.ndim(values[1]) != 0:
+            return NotImplemented
+        return _wrap(ufunc(*values, **kwargs), unit ** np.asarray(values[1]).item())
+    return NotImplemented
+
+
+def _array_function(func, types: tuple, args: tuple, kwargs: dict):
+    """
+    Returns the result of the numpy function, 'func', for the numpy functions
+    registered in _ARRAY_FUNCTIONS. Returns NotImplemented otherwise.
+    """
+    handler = _ARRAY_FUNCTIONS.get(func.__name__)
+    if handler is None or getattr(np, func.__name__, None) is not func:
+        return NotImplemented
+    if not all(issubclass(t, (Physical, PhysicalArray, np.ndarray)) for t in types):
+        return NotImplemented
+    if _has_object_array(args):
+        # As in _array_ufunc(); with only object arrays left in the arguments,
+        # numpy's own implementation of 'func' works on the Physicals
+        args = _from_object_arrays(args)
+        if _has_object_array(args):
+            kwargs = {name: _as_object_array(arg) for name, arg in kwargs.items()}
+            return func(*_as_object_array(args), **kwargs)
+    return handler(*args, **kwargs)
+
+
+def _implements(*names: str):
+    """
+    Returns a decorator that registers the decorated function as the handler
+    for the numpy functions called 'names'.
+    """
+
+    def decorator(handler):
+        for name in names:
+            _ARRAY_FUNCTIONS[name] = handler
+        return handler
+
+    return decorator
+
+
+def _same_units_function(name: str):
+    """
+    Returns a handler for the numpy function, 'name', whose result has the
+    units of its first argument.
+    """
+
+    def handler(a, *args, **kwargs):
+        unit, value = _unit_and_value(a)
+        return _wrap(getattr(np, name)(value, *args, **kwargs), unit)
+
+    return handler
+
+
+def _unitless_function(name: str):
+    """
+    Returns a handler for the numpy function, 'name', whose result is computed
+    from the values of its first argument and has no units (e.g. np.argsort).
+    """
+
+    def handler(a, *args, **kwargs):
+        _, value = _unit_and_value(a)
+        return getattr(np, name)(value, *args, **kwargs)
+
+    return handler
+
+
+for _name in (
+    "sum",
+    "mean",
+    "median",
+    "std",
+    "min",
+    "max",
+    "amin",
+    "amax",
+    "ptp",
+    "cumsum",
+    "sort",
+    "squeeze",
+    "ravel",
+    "reshape",
+    "transpose",
+    "diff",
+):
+    _implements(_name)(_same_units_function(_name))
+
+for _name in ("argsort", "argmin", "argmax", "shape", "ndim", "size"):
+    _implements(_name)(_unitless_function(_name))
+
+
+@_implements("var")
+def _var(a, *args, **kwargs):
+    unit, value = _unit_and_value(a)
+    return _wrap(np.var(value, *args, **kwargs), unit ** 2)
+
+
+def _join_function(name: str):
+    """
+    Returns a handler for the numpy function, 'name', that joins a sequence
+    of equally dimensioned arrays (e.g. np.concatenate).
+    """
+
+    def handler(arrays, *args, **kwargs):
+        units, values = zip(*(_unit_and_value(array) for array in arrays))
+        if any(unit is None for unit in units):
+            raise ValueError(f"Can only {name} Physical or PhysicalArray instances.")
+        _check_same_dimensions(list(units), name)
+        return _wrap(getattr(np, name)(values, *args, **kwargs), units[0])
+
+    return handler
+
+
+for _name in ("concatenate", "stack", "vstack", "hstack"):
+    _implements(_name)(_join_function(_name))
+
+
+@_implements("dot")
+def _dot(a, b, *args, **kwargs):
+    unit_a, value_a = _unit_and_value(a)
+    unit_b, value_b = _unit_and_value(b)
+    unit = unit_a * unit_b if unit_a and unit_b else unit_a or unit_b
+    return _wrap(np.dot(value_a, value_b, *args, **kwargs), unit)
+
+
+@_implements("isclose")
+def _isclose(a, b, rtol=1e-05, atol=1e-08, equal_nan=False):
+    unit_a, value_a = _unit_and_value(a)
+    unit_b, value_b = _unit_and_value(b)
+    _check_same_dimensions([unit for unit in (unit_a, unit_b) if unit], "compare")
+    _, atol = _unit_and_value(atol)
+    return np.isclose(value_a, value_b, rtol=rtol, atol=atol, equal_nan=equal_nan)
+
+
+@_implements("allclose")
+def _allclose(a, b, rtol=1e-05, atol=1e-08, equal_nan=False):
+    return bool(np.all(_isclose(a, b, rtol, atol, equal_nan)))
@@ -0,0 +1,148 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+An Apache Arrow extension type for physical quantities: PhysicalArrowType
+stores the values (in SI base units) as a float64 array and carries the
+Dimensions, factor and precision as type metadata, so the units survive
+Arrow IPC and Parquet files. Requires pyarrow; the type is registered with
+pyarrow when this module is imported (which PhysicalArray.to_arrow() and
+.from_arrow() do).
+
+    table = pa.table({"load": to_arrow(loads)})
+    pq.write_table(table, "loads.parquet")
+    loads = from_arrow(pq.read_table("loads.parquet")["load"])
+"""
+
+from fractions import Fraction
+import json
+from typing import Union
+
+import pyarrow as pa
+
+from forallpeople import Physical
+from forallpeople.dimensions import Dimensions
+from forallpeople.physical_array import PhysicalArray
+
+
+class PhysicalArrowType(pa.ExtensionType):
+    """
+    A class that defines the Arrow extension type, "forallpeople.physical", of an
+    array of physical quantities with the same 'dimensions', 'factor' and
+    'precision' (see Physical) over float64 storage of the values in SI base units.
+    """
+
+    def __init__(self, dimensions: Dimensions, factor: float = 1, precision: int = 3):
+        self.dimensions = Dimensions(*dimensions)
+        self.factor = factor
+        self.precision = precision
+        super().__init__(pa.float64(), "forallpeople.physical")
+
+    def __arrow_ext_serialize__(self) -> bytes:
+        metadata = {
+            "dimensions": [
+                str(dim) if type(dim) is Fraction else dim for dim in self.dimensions
+            ],
+            "factor": self.factor,
+            "precision": self.precision,
+        }
+        return json.dumps(metadata).encode("utf-8")
+
+    @classmethod
+    def __arrow_ext_deserialize__(cls, storage_type, serialized: bytes):
+        metadata = json.loads(serialized.decode("utf-8"))
+        dims = [
+            Fraction(dim) if isinstance(dim, str) else dim
+            for dim in metadata["dimensions"]
+        ]
+        return cls(dims, metadata["factor"], metadata["precision"])
+
+    def __arrow_ext_class__(self):
+        return PhysicalArrowArray
+
+    def to_pandas_dtype(self):
+        from forallpeople.physical_pandas import PhysicalDtype
+
+        return PhysicalDtype(self.unit)
+
+    @property
+    def unit(self) -> Physical:
+        """
+        Returns a Physical of one unit of the type's units (e.g. 1 kip).
+        """
+        return Physical(1 / self.factor, self.dimensions, self.factor, self.precision)
+
+
+class PhysicalArrowArray(pa.ExtensionArray):
+    """
+    A class that defines the pyarrow array of a PhysicalArrowType.
+    """
+
+    def to_physical_array(self) -> PhysicalArray:
+        """
+        Returns a PhysicalArray of the values (see from_arrow()).
+        """
+        return from_arrow(self)
+
+
+def to_arrow(physicals) -> PhysicalArrowArray:
+    """
+    Returns a pyarrow array of PhysicalArrowType for 'physicals', a PhysicalArray
+    (flattened if it is not 1-d), a pandas PhysicalExtensionArray, or a sequence
+    of Physical instances of the same dimensions. The values are not copied if
+    they are already a contiguous float64 array. NaN values stay NaN (not null).
+    """
+    if not hasattr(physicals, "to_physical_array") and not isinstance(
+        physicals, PhysicalArray
+    ):
+        physicals = PhysicalArray.from_physicals(physicals)
+    elif hasattr(physicals, "to_physical_array"):
+        physicals = physicals.to_physical_array()
+    arrow_type = PhysicalArrowType(
+        physicals.dimensions, physicals.factor, physicals.precision
+    )
+    storage = pa.array(physicals.value.ravel(), type=pa.float64())
+    return pa.ExtensionArray.from_storage(arrow_type, storage)
+
+
+def from_arrow(array: Union[pa.Array, pa.ChunkedArray]) -> PhysicalArray:
+    """
+    Returns a PhysicalArray of 'array', a pyarrow (chunked) array of
+    PhysicalArrowType. The values are not copied if 'array' is a single chunk
+    without nulls (e.g. when memory-mapped from an Arrow IPC file); nulls become
+    NaN. Raises TypeError if 'array' is not of PhysicalArrowType.
+    """
+    arrow_type = array.type
+    if not isinstance(arrow_type, PhysicalArrowType):
+        raise TypeError(f"Expected an array of PhysicalArrowType, not {arrow_type}.")
+    if isinstance(array, pa.ChunkedArray):
+        chunks = array.chunks
+        if len(chunks) == 1:
+            array = chunks[0]
+        else:
+            storage = pa.chunked_array(
+                [chunk.storage for chunk in chunks], pa.float64()
+            ).combine_chunks()
+            array = pa.ExtensionArray.from_storage(arrow_type, storage)
+    storage = array.storage
+    if storage.null_count:
+        values = storage.to_numpy(zero_copy_only=False)
+    else:
+        values = storage.to_numpy(zero_copy_only=True)
+    return PhysicalArray(
+        values, arrow_type.dimensions, arrow_type.factor, arrow_type.precision
+    )
+
+
+pa.register_extension_type(PhysicalArrowType(Dimensions(0, 0, 0, 0, 0, 0, 0)))
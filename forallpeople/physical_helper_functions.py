@@ -14,7 +14,9 @@
 
 
 from collections import ChainMap
+from fractions import Fraction
 import functools
+import math
 from typing import Union, Optional
 from forallpeople.dimensions import Dimensions
 import forallpeople.tuplevector as vec
@@ -42,6 +44,9 @@ _prefixes = {
     "y": 1e-24,
 }
 
+# (prefix, power_of_ten) from smallest to largest power_of_ten
+_prefix_table = tuple(sorted(_prefixes.items(), key=lambda prefix: prefix[1]))
+
 _superscripts = {
     "1": "¹",
     "2": "²",
@@ -59,6 +64,10 @@ _superscripts = {
 _eps = 1e-7
 _total_precision = 6
 
+# If True, Physical.__pow__ and .sqrt() keep fractional exponents as exact
+# Fractions (see rational_exponents() in forallpeople)
+_rational_exponents = False
+
 
 def _evaluate_dims_and_factor(
     dims_orig: Dimensions,
@@ -186,6 +195,8 @@ def _get_unit_components_from_dims(dims: Dimensions):
     unit_symbols = dims._fields
     for idx, dim in enumerate(dims):
         if dim:  # int
+            if type(dim) is Fraction:
+                dim = float(dim)  # Displayed like float exponents
             unit_tuple = (unit_symbols[idx], dim)
             unit_components.append(unit_tuple)
     return unit_components
@@ -230,6 +241,8 @@ def _format_exponent(
     if power == 1:
         return ""
 
+    if isinstance(power, Fraction):
+        power = float(power)
     if abs((abs(power) - round(abs(power)))) <= eps:
         power = int(round(power))
     exponent = str(power)
@@ -251,7 +264,9 @@ def _get_superscript_string(exponent: str) -> str:
 ### Mathematical helper functions ###
 
 
-def _powers_of_derived(dims: Dimensions, units_env: dict) -> Union[int, float]:
+def _powers_of_derived(
+    dims: Dimensions, units_env: dict, parallel_index: Optional[dict] = None
+) -> Union[int, float]:
     """
     Returns an integer value that represents the exponent of a unit if the
     dimensions
@@ -263,8 +278,10 @@ def _powers_of_derived(dims: Dimensions, units_env: dict) -> Union[int, float]:
     2.
     This function returns the 2, stating that `dims` is the second power of a
     derived dimension in `units_env`.
+    If 'parallel_index' is given (see _build_parallel_index), it is used to
+    find the parallel dimensions instead of scanning all of `units_env`.
     """
-    quotient_1 = _dims_quotient(dims, units_env)
+    quotient_1 = _dims_quotient(dims, units_env, parallel_index)
     quotient_2 = _dims_basis_multiple(dims)
     quotient_1_mean = None
     if quotient_1 is not None:
@@ -272,40 +289,47 @@ def _powers_of_derived(dims: Dimensions, units_env: dict) -> Union[int, float]:
         
     if quotient_1 is not None and quotient_1_mean != -1:
         power_of_derived = vec.mean(quotient_1, ignore_empty=True)
-        base_dimensions = vec.divide(dims, quotient_1, ignore_zeros=True)
+        base_dimensions = dims.divide(quotient_1, ignore_zeros=True)
         return ((power_of_derived or 1), base_dimensions)
     elif quotient_1_mean == -1 and quotient_2 is not None: # Situations like Hz and s
         power_of_basis = vec.mean(quotient_2, ignore_empty=True)
-        base_dimensions = vec.divide(dims, quotient_2, ignore_zeros=True)
+        base_dimensions = dims.divide(quotient_2, ignore_zeros=True)
         return ((power_of_basis or 1), base_dimensions)
     elif quotient_1_mean == -1: # Now we can proceed with an inverse  unit
         power_of_derived = vec.mean(quotient_1, ignore_empty=True)
-        base_dimensions = vec.divide(dims, quotient_1, ignore_zeros=True)
+        base_dimensions = dims.divide(quotient_1, ignore_zeros=True)
         return ((power_of_derived or 1), base_dimensions)
     elif quotient_2 is not None:
         power_of_basis = vec.mean(quotient_2, ignore_empty=True)
-        base_dimensions = vec.divide(dims, quotient_2, ignore_zeros=True)
+        base_dimensions = dims.divide(quotient_2, ignore_zeros=True)
         return ((power_of_basis or 1), base_dimensions)
     else:
         return (1, dims)
 
 #@functools.lru_cache(maxsize=None) Cannot use cache with dict input
-def _dims_quotient(dimensions: Dimensions, units_env: dict) -> Optional[Dimensions]:
+def _dims_quotient(
+    dimensions: Dimensions, units_env: dict, parallel_index: Optional[dict] = None
+) -> Optional[Dimensions]:
     """
     Returns a Dimensions object representing the element-wise quotient between
     'dimensions' and a defined unit if 'dimensions' is a scalar multiple
     of a defined unit in the global environment variable.
     Returns None otherwise.
+    If 'parallel_index' is given, only the candidate dimensions stored in the
+    index for the direction of 'dimensions' are checked.
     """
-    derived = units_env["derived"]
-    defined = units_env["defined"]
-    all_units = ChainMap(defined, derived)
+    if parallel_index is None:
+        derived = units_env["derived"]
+        defined = units_env["defined"]
+        dimension_keys = ChainMap(defined, derived).keys()
+    else:
+        dimension_keys = _parallel_candidates(dimensions, parallel_index)
     potential_inv = None # A flag to catch a -1 value (an inversion)
     quotient = None
     quotient_result = None
-    for dimension_key in all_units.keys():
+    for dimension_key in dimension_keys:
         if _check_dims_parallel(dimension_key, dimensions):
-            quotient = vec.divide(dimensions, dimension_key, ignore_zeros=True)
+            quotient = dimensions.divide(dimension_key, ignore_zeros=True)
             mean = vec.mean(quotient, ignore_empty=True)
             if mean == -1: 
                 potential_inv = quotient
@@ -317,6 +341,59 @@ def _dims_quotient(dimensions: Dimensions, units_env: dict) -> Optional[Dimensio
 
 
 
+def _parallel_key(dims: Dimensions) -> Optional[tuple]:
+    """
+    Returns a tuple representing the direction of 'dims': 'dims' divided by its
+    first non-zero element (so parallel and anti-parallel vectors share a key),
+    rounded to absorb float error. Returns None if 'dims' is the zero vector.
+    e.g. (0, 2, -4, 0, 0, 0, 0) -> (0.0, 1.0, -2.0, 0.0, 0.0, 0.0, 0.0)
+    """
+    for dim in dims:
+        if dim:
+            return tuple(round(float(d / dim), 9) for d in dims)
+    return None
+
+
+def _build_parallel_index(units_env: dict) -> dict:
+    """
+    Returns a dict mapping the _parallel_key of each dimension in 'units_env' to a
+    tuple of the dimensions in 'units_env' that share that direction. The tuples
+    keep the order in which _dims_quotient would otherwise scan 'units_env'.
+    Zero vector dimensions are parallel to everything and so are included in
+    every tuple; they are also stored, alone, under the key None.
+    """
+    derived = units_env["derived"]
+    defined = units_env["defined"]
+    all_dims = list(ChainMap(defined, derived).keys())
+    null_positions = []
+    positions_by_key = {}
+    for position, dims in enumerate(all_dims):
+        key = _parallel_key(dims)
+        if key is None:
+            null_positions.append(position)
+        else:
+            positions_by_key.setdefault(key, []).append(position)
+
+    parallel_index = {None: tuple(all_dims[pos] for pos in null_positions)}
+    for key, positions in positions_by_key.items():
+        parallel_index[key] = tuple(
+            all_dims[pos] for pos in sorted(positions + null_positions)
+        )
+    return parallel_index
+
+
+def _parallel_candidates(dims: Dimensions, parallel_index: dict) -> tuple:
+    """
+    Returns the tuple of dimensions in 'parallel_index' that may be parallel
+    to 'dims'. Returns an empty tuple if 'dims' is the zero vector since
+    _dims_quotient never finds a quotient for it.
+    """
+    key = _parallel_key(dims)
+    if key is None:
+        return ()
+    return parallel_index.get(key, parallel_index.get(None, ()))
+
+
 @functools.lru_cache(maxsize=None)
 def _check_dims_parallel(d1: Dimensions, d2: Dimensions) -> bool:
     """
@@ -346,28 +423,58 @@ def _dims_basis_multiple(dims: Dimensions) -> Optional[Dimensions]:
     return dims
 
 
+def _prefix_threshold(index: int, abs_power: Union[int, float], kg_factor: float) -> float:
+    """
+    Returns the smallest abs(value) that is displayed with the prefix at 'index'
+    in _prefix_table for a unit raised to 'abs_power' (inf if it overflows).
+    """
+    try:
+        return (_prefix_table[index][1] / kg_factor) ** abs_power
+    except OverflowError:
+        return float("inf")
+
+
+def _prefix_index(
+    value: float, power: Union[int, float], kg: bool = False
+) -> Optional[int]:
+    """
+    Returns the index in _prefix_table of the largest prefix whose threshold
+    (see _prefix_threshold) is not greater than abs(value). Returns -1 if
+    abs(value) is smaller than every threshold and None if 'value' is nan.
+    The index is estimated from log10(abs(value)) and then checked against
+    the neighbouring thresholds so that the result is exactly that of
+    scanning every prefix in turn.
+    """
+    abs_value = abs(value)
+    abs_power = abs(power)
+    kg_factor = 1000 if kg else 1
+    last = len(_prefix_table) - 1
+    if abs_value != abs_value:
+        return None
+    elif 0 < abs_value < float("inf") and abs_power:
+        # threshold <= abs_value <==> 3 * index - 24 - 3 * kg <= log10(abs_value) / abs_power
+        index = math.floor((math.log10(abs_value) / abs_power + 24 + 3 * kg) / 3)
+        index = min(max(index, -1), last)
+    else:  # zero, infinite, or a power of 0: fall back to scanning
+        index = last
+    while index >= 0 and _prefix_threshold(index, abs_power, kg_factor) > abs_value:
+        index -= 1
+    while (
+        index < last and _prefix_threshold(index + 1, abs_power, kg_factor) <= abs_value
+    ):
+        index += 1
+    return index
+
+
 def _auto_prefix(value: float, power: Union[int, float], kg: bool = False) -> str:
     """
     Returns a string "prefix" of an appropriate value if self.value should be prefixed
     i.e. it is a big enough number (e.g. 5342 >= 1000; returns "k" for "kilo")
     """
-    kg_factor = 1
-    if kg:
-        kg_factor = 1000
-    prefixes = _prefixes
-    if abs(value) >= 1:
-        for prefix, power_of_ten in prefixes.items():
-            if abs(value) >= (power_of_ten / kg_factor) ** abs(power):
-                return prefix
-    else:
-        reverse_prefixes = sorted(prefixes.items(), key=lambda prefix: prefix[0])
-        # Get the smallest prefix to start...
-        previous_prefix = reverse_prefixes[0][0]
-        for prefix, power_of_ten in reversed(list(prefixes.items())):
-            if abs(value) < (power_of_ten / kg_factor) ** abs(power):
-                return previous_prefix
-            else:
-                previous_prefix = prefix
+    index = _prefix_index(value, power, kg)
+    if index is None or index < 0:  # NaN or smaller than all prefixes
+        return ""
+    return _prefix_table[index][0]
 
 
 def _auto_prefix_kg(value: float, power: Union[int, float]) -> str:
@@ -376,20 +483,7 @@ def _auto_prefix_kg(value: float, power: Union[int, float]) -> str:
     has a prefix of "k" as an SI base unit. The difference is the comparison of
     'power_of_ten'/1000 vs 'power_of_ten'.
     """
-    prefixes = _prefixes
-    if abs(value) >= 1:
-        for prefix, power_of_ten in prefixes.items():
-            if abs(value) >= (power_of_ten / 1000) ** abs(power):
-                return prefix
-    else:
-        reverse_prefixes = sorted(prefixes.items(), key=lambda prefix: prefix[0])
-        # Get the smallest prefix to start...
-        previous_prefix = reverse_prefixes[0][0]
-        for prefix, power_of_ten in reversed(list(prefixes.items())):
-            if abs(value) < (power_of_ten / 1000) ** abs(power):
-                return previous_prefix
-            else:
-                previous_prefix = prefix
+    return _auto_prefix(value, power, kg=True)
 
 
 def _auto_prefix_value(
@@ -402,19 +496,44 @@ def _auto_prefix_value(
     kg_factor = 1
     if kg:
         kg_factor = 1000
-    prefixes = _prefixes
     if prefixed:
-        return value / ((prefixes[prefixed] / kg_factor) ** power)
-    if abs(value) >= 1:
-        for prefix, power_of_ten in prefixes.items():
-            if abs(value) >= (power_of_ten / kg_factor) ** abs(power):
-                return value / ((power_of_ten / kg_factor) ** power)
-    else:
-        reverse_prefixes = sorted(prefixes.items(), key=lambda pre_fact: pre_fact[1])
-        # Get the smallest factor to start...
-        previous_power_of_ten = reverse_prefixes[0][1]
-        for prefix, power_of_ten in reversed(list(prefixes.items())):
-            if abs(value) < (power_of_ten / kg_factor) ** abs(power):
-                return value / ((previous_power_of_ten / kg_factor) ** abs(power))
-            else:
-                previous_power_of_ten = power_of_ten
+        return value / ((_prefixes[prefixed] / kg_factor) ** power)
+    index = _prefix_index(value, power, kg)
+    if index is None:  # NaN
+        return value
+    elif abs(value) >= 1:
+        return value / ((_prefix_table[index][1] / kg_factor) ** power)
+    # Values < 1 are scaled by abs(power) and by the smallest prefix if
+    # they are smaller than all of the prefixes
+    power_of_ten = _prefix_table[max(index, 0)][1]
+    return value / ((power_of_ten / kg_factor) ** abs(power))
+
+
+def _auto_prefix_array(values, power: Union[int, float], kg: bool = False):
+    """
+    Returns a tuple of two numpy arrays: the prefix (as a str) for each value in
+    'values' and each value scaled by its prefix. This is a vectorized version
+    of _auto_prefix and _auto_prefix_value (for values without a 'prefixed'
+    prefix) for use with arrays of values. Requires numpy.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    abs_values = np.abs(values)
+    abs_power = abs(power)
+    kg_factor = 1000 if kg else 1
+    last = len(_prefix_table) - 1
+    powers_of_ten = np.array([power_of_ten for _, power_of_ten in _prefix_table])
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        thresholds = (powers_of_ten / kg_factor) ** abs_power
+        # The index of the largest threshold <= abs_value (or -1)
+        indexes = np.searchsorted(thresholds, abs_values, side="right") - 1
+        prefix_names = np.array([prefix for prefix, _ in _prefix_table] + [""])
+        prefixes = prefix_names[indexes]  # index -1 is ""
+        scales = np.where(
+            abs_values >= 1,
+            (powers_of_ten[np.maximum(indexes, 0)] / kg_factor) ** power,
+            (powers_of_ten[np.maximum(indexes, 0)] / kg_factor) ** abs_power,
+        )
+        scaled = values / scales
+    return prefixes, scaled
@@ -0,0 +1,482 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+A pandas extension type for columns of physical quantities: the "physical[kN]"
+dtype (PhysicalDtype) is stored as a float64 numpy array of values (in SI base
+units) with one Dimensions and factor (PhysicalExtensionArray), so arithmetic,
+comparisons, reductions and groupby aggregations are vectorized instead of
+calling Physical methods for each row. Requires pandas; importing this module
+registers the dtype with pandas:
+
+    import forallpeople.physical_pandas
+    loads = pd.Series([1.5, 2.0], dtype="physical[kN]")
+"""
+
+import operator
+import re
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import (
+    ExtensionArray,
+    ExtensionDtype,
+    register_extension_dtype,
+    take,
+)
+
+from forallpeople import Physical
+from forallpeople.parsing import parse, parse_units
+from forallpeople.physical_array import PhysicalArray
+
+NUMBER = (int, float)
+
+
+@register_extension_dtype
+class PhysicalDtype(ExtensionDtype):
+    """
+    A class that defines the pandas dtype of a column of physical quantities in
+    the units, 'units', which is a unit expression (see forallpeople.parsing),
+    e.g. "kN", "kip/ft", or "m·s⁻²", or a Physical (whose units, without an SI
+    prefix, are used). .unit is a Physical of one of the units (e.g. 1 mm), which
+    is the scale of the numbers put in or taken out of the column. Dtypes are
+    equal if their units have equal dimensions, scale and factor. "physical" on
+    its own (units=None) lets the units be taken from the data.
+    """
+
+    type = Physical
+    kind = "O"
+    na_value = np.nan
+    _is_numeric = True
+    _match = re.compile(r"^physical(?:\[(?P<units>.+)\])?$")
+
+    def __init__(self, units: Union[str, Physical, None] = None):
+        if isinstance(units, Physical):
+            unit = _unit_of(units)
+            units = _units_string(unit)
+        elif units is not None:
+            unit = parse_units(units)
+            if not isinstance(unit, Physical):
+                raise ValueError(f"'{units}' is dimensionless.")
+        else:
+            unit = None
+        self.units = units
+        self.unit = unit
+
+    @property
+    def name(self) -> str:
+        if self.units is None:
+            return "physical"
+        return f"physical[{self.units}]"
+
+    @classmethod
+    def construct_array_type(cls):
+        return PhysicalExtensionArray
+
+    @classmethod
+    def construct_from_string(cls, string: str):
+        if not isinstance(string, str):
+            raise TypeError(
+                f"'construct_from_string' expects a string, got {type(string)}"
+            )
+        match = cls._match.match(string)
+        if match is None:
+            raise TypeError(f"Cannot construct a '{cls.__name__}' from '{string}'")
+        return cls(match.group("units"))
+
+    @property
+    def _key(self) -> Optional[tuple]:
+        if self.unit is None:
+            return None
+        return (self.unit.dimensions._key, self.unit.value, self.unit.factor)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, str):
+            try:
+                other = self.construct_from_string(other)
+            except (TypeError, ValueError):
+                return False
+        return isinstance(other, PhysicalDtype) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash((PhysicalDtype, self._key))
+
+    def __from_arrow__(self, array):
+        """
+        Returns a PhysicalExtensionArray of the pyarrow array, 'array', of
+        PhysicalArrowType, e.g. when reading a Parquet file into a DataFrame.
+        """
+        return PhysicalExtensionArray.from_arrow(array)
+
+    def __repr__(self):
+        return self.name
+
+
+class PhysicalExtensionArray(ExtensionArray):
+    """
+    A class that defines the pandas ExtensionArray of a "physical[...]" column:
+    a float64 numpy array of values in SI base units ('value') with the
+    Dimensions and factor of its PhysicalDtype. Missing values are NaN. Scalars
+    are returned as Physical instances and the array can be converted to a
+    PhysicalArray with .to_physical_array().
+    """
+
+    def __init__(self, value, dtype: PhysicalDtype, copy: bool = False):
+        if dtype.unit is None:
+            raise ValueError("The dtype of a PhysicalExtensionArray needs units.")
+        self.value = np.array(value, dtype=np.float64, copy=copy or None)
+        self._dtype = dtype
+
+    ### Construction ###
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy: bool = False):
+        if isinstance(dtype, str):
+            dtype = PhysicalDtype.construct_from_string(dtype)
+        if isinstance(scalars, cls):
+            return scalars._to_dtype(dtype or scalars.dtype, copy)
+        if isinstance(scalars, PhysicalArray):
+            array = cls(scalars.value.ravel(), PhysicalDtype(scalars.unit), copy)
+            return array._to_dtype(dtype or array.dtype)
+
+        scalars = list(scalars)
+        unit = dtype.unit if dtype is not None else None
+        if unit is None:
+            first = next((item for item in scalars if isinstance(item, Physical)), None)
+            if first is None:
+                raise ValueError(
+                    "Cannot infer the units of a column without Physicals."
+                )
+            dtype = PhysicalDtype(_unit_of(first))
+            unit = dtype.unit
+        values = np.empty(len(scalars), dtype=np.float64)
+        for idx, item in enumerate(scalars):
+            if isinstance(item, Physical):
+                if item.dimensions != unit.dimensions:
+                    raise ValueError(
+                        f"Cannot put {item} in a column of '{dtype.name}': "
+                        + ".dimensions attributes are incompatible (not equal)"
+                    )
+                values[idx] = item.value
+            elif item is None or item is pd.NA or item is pd.NaT:
+                values[idx] = np.nan
+            elif isinstance(item, NUMBER + (np.number,)):
+                values[idx] = item * unit.value  # Numbers are in the dtype's units
+            else:
+                raise TypeError(f"Cannot put {item!r} in a column of '{dtype.name}'.")
+        return cls(values, dtype)
+
+    @classmethod
+    def _from_sequence_of_strings(cls, strings, *, dtype, copy: bool = False):
+        scalars = [
+            parse(string) if isinstance(string, str) and string.strip() else None
+            for string in strings
+        ]
+        return cls._from_sequence(scalars, dtype=dtype)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls(values, original.dtype)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        values = np.concatenate([array.value for array in to_concat])
+        return cls(values, to_concat[0].dtype)
+
+    def _to_dtype(self, dtype: PhysicalDtype, copy: bool = False):
+        """
+        Returns self (or a copy) as an array of 'dtype'. The SI values are kept, so
+        the numbers in the units of 'dtype' (e.g. from .to_numpy()) are rescaled.
+        Raises ValueError if the dimensions differ.
+        """
+        if dtype.unit is None or dtype == self.dtype:
+            return self.copy() if copy else self
+        if dtype.unit.dimensions != self.dtype.unit.dimensions:
+            raise ValueError(f"Cannot convert '{self.dtype.name}' to '{dtype.name}'.")
+        return type(self)(self.value, dtype, copy)
+
+    ### Attributes ###
+
+    @property
+    def dtype(self) -> PhysicalDtype:
+        return self._dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.value.nbytes
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def to_physical_array(self) -> PhysicalArray:
+        """
+        Returns a PhysicalArray of the values (missing values are NaN).
+        """
+        unit = self.dtype.unit
+        return PhysicalArray(self.value, unit.dimensions, unit.factor, unit.precision)
+
+    @classmethod
+    def from_arrow(cls, array):
+        """
+        Returns a PhysicalExtensionArray of the pyarrow array, 'array', of
+        PhysicalArrowType (see forallpeople.physical_arrow). Requires pyarrow.
+        """
+        from forallpeople.physical_arrow import from_arrow
+
+        physicals = from_arrow(array)
+        return cls(physicals.value, PhysicalDtype(_unit_of(physicals.unit)))
+
+    def to_arrow(self):
+        """
+        Returns a pyarrow array of PhysicalArrowType of the values with the units
+        of the dtype as type metadata (see forallpeople.physical_arrow). Requires
+        pyarrow.
+        """
+        from forallpeople.physical_arrow import to_arrow
+
+        return to_arrow(self)
+
+    def __arrow_array__(self, type=None):
+        return self.to_arrow()
+
+    def to_numpy(
+        self, dtype=None, copy: bool = False, na_value=pd.api.extensions.no_default
+    ):
+        if dtype is not None and np.dtype(dtype).kind in "fiu":
+            values = self.value / self.dtype.unit.value  # In the dtype's units
+            if na_value is not pd.api.extensions.no_default:
+                values = np.where(np.isnan(values), na_value, values)
+            return values.astype(dtype, copy=False)
+        return super().to_numpy(dtype=dtype, copy=copy, na_value=na_value)
+
+    ### Container Methods ###
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and len(key) == 1:
+            key = key[0]
+        if not np.isscalar(key):
+            key = pd.api.indexers.check_array_indexer(self, key)
+        value = self.value[key]
+        if np.ndim(value) == 0:
+            return self._box(value)
+        return type(self)(value, self.dtype)
+
+    def __setitem__(self, key, value):
+        if not np.isscalar(key):
+            key = pd.api.indexers.check_array_indexer(self, key)
+        if isinstance(value, Physical) or pd.api.types.is_scalar(value):
+            self.value[key] = self._from_sequence([value], dtype=self.dtype).value[0]
+        else:
+            self.value[key] = self._from_sequence(value, dtype=self.dtype).value
+
+    def _box(self, value: float) -> Union[Physical, float]:
+        """
+        Returns the Physical of 'value', an SI value in the units of self.dtype,
+        or NaN if it is missing.
+        """
+        if np.isnan(value):
+            return self.dtype.na_value
+        unit = self.dtype.unit
+        return Physical(float(value), unit.dimensions, unit.factor, unit.precision)
+
+    def isna(self):
+        return np.isnan(self.value)
+
+    def take(self, indices, *, allow_fill: bool = False, fill_value=None):
+        if allow_fill and fill_value is not None and not pd.isna(fill_value):
+            fill_value = self._from_sequence([fill_value], dtype=self.dtype).value[0]
+        else:
+            fill_value = np.nan
+        values = take(self.value, indices, allow_fill=allow_fill, fill_value=fill_value)
+        return type(self)(values, self.dtype)
+
+    def copy(self):
+        return type(self)(self.value, self.dtype, copy=True)
+
+    def _values_for_factorize(self):
+        return self.value, np.nan
+
+    def _values_for_argsort(self):
+        return self.value
+
+    def _formatter(self, boxed: bool = False):
+        return repr
+
+    ### Arithmetic and comparisons ###
+
+    def _operand(self, other):
+        """
+        Returns 'other' as an operand of PhysicalArray arithmetic (or
+        NotImplemented if pandas should handle it first).
+        """
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        if isinstance(other, PhysicalExtensionArray):
+            return other.to_physical_array()
+        if isinstance(other, (list, tuple)):
+            other = np.asarray(other)
+        if isinstance(other, np.ndarray) and other.dtype == object:
+            return PhysicalArray.from_physicals(other)
+        return other
+
+    def _wrap_result(self, result):
+        """
+        Returns the PhysicalArray, 'result', as a PhysicalExtensionArray (other
+        results, e.g. of comparisons, are returned unchanged).
+        """
+        if isinstance(result, PhysicalArray):
+            unit = self.dtype.unit
+            if result.dimensions == unit.dimensions and result.factor == unit.factor:
+                dtype = self.dtype  # e.g. loads * 2 stays in "physical[kN]"
+            else:
+                dtype = PhysicalDtype(result.unit)
+            return type(self)(result.value, dtype)
+        return result
+
+    def _binary_op(self, other, op):
+        other = self._operand(other)
+        if other is NotImplemented:
+            return NotImplemented
+        return self._wrap_result(op(self.to_physical_array(), other))
+
+    def __add__(self, other):
+        return self._binary_op(other, operator.add)
+
+    def __radd__(self, other):
+        return self._binary_op(other, lambda a, b: b + a)
+
+    def __sub__(self, other):
+        return self._binary_op(other, operator.sub)
+
+    def __rsub__(self, other):
+        return self._binary_op(other, lambda a, b: b - a)
+
+    def __mul__(self, other):
+        return self._binary_op(other, operator.mul)
+
+    def __rmul__(self, other):
+        return self._binary_op(other, lambda a, b: b * a)
+
+    def __truediv__(self, other):
+        return self._binary_op(other, operator.truediv)
+
+    def __rtruediv__(self, other):
+        return self._binary_op(other, lambda a, b: b / a)
+
+    def __pow__(self, other):
+        return self._binary_op(other, operator.pow)
+
+    def __neg__(self):
+        return type(self)(-self.value, self.dtype)
+
+    def __pos__(self):
+        return self.copy()
+
+    def __abs__(self):
+        return type(self)(np.abs(self.value), self.dtype)
+
+    def __eq__(self, other):
+        return self._binary_op(other, operator.eq)
+
+    def __ne__(self, other):
+        return self._binary_op(other, operator.ne)
+
+    def __lt__(self, other):
+        return self._binary_op(other, operator.lt)
+
+    def __le__(self, other):
+        return self._binary_op(other, operator.le)
+
+    def __gt__(self, other):
+        return self._binary_op(other, operator.gt)
+
+    def __ge__(self, other):
+        return self._binary_op(other, operator.ge)
+
+    ### Reductions ###
+
+    _REDUCTIONS = {"sum", "mean", "median", "min", "max", "std", "var"}
+
+    def _reduce(
+        self, name: str, *, skipna: bool = True, keepdims: bool = False, **kwargs
+    ):
+        if name not in self._REDUCTIONS:
+            raise TypeError(f"'{self.dtype.name}' does not support reduction '{name}'")
+        values = self.value[~np.isnan(self.value)] if skipna else self.value
+        min_count = kwargs.get("min_count", 0) if name == "sum" else 1
+        if name in ("std", "var"):
+            kwargs = {"ddof": kwargs.get("ddof", 1)}
+        else:
+            kwargs = {}
+        if len(values) < min_count:
+            result = np.nan
+        elif not len(values):
+            result = self._box(0.0)
+        else:
+            unit = self.dtype.unit
+            array = PhysicalArray(values, unit.dimensions, unit.factor, unit.precision)
+            result = getattr(np, name)(array, **kwargs)
+        if keepdims:
+            if not isinstance(result, Physical):
+                return self._from_sequence([result], dtype=self.dtype)
+            return self._from_sequence([result], dtype=PhysicalDtype(_unit_of(result)))
+        return result
+
+    def _groupby_op(self, *, how, has_dropped_na, min_count, ngroups, ids, **kwargs):
+        if how not in ("sum", "mean", "min", "max", "std"):
+            return super()._groupby_op(
+                how=how,
+                has_dropped_na=has_dropped_na,
+                min_count=min_count,
+                ngroups=ngroups,
+                ids=ids,
+                **kwargs,
+            )
+        mask = (ids >= 0) & ~np.isnan(self.value)
+        group_ids, values = ids[mask], self.value[mask]
+        counts = np.bincount(group_ids, minlength=ngroups)
+        sums = np.bincount(group_ids, weights=values, minlength=ngroups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if how == "sum":
+                result = sums
+            elif how == "mean":
+                result = sums / counts
+            elif how == "std":
+                ddof = kwargs.get("ddof", 1)
+                means = sums / counts
+                deviations = (values - means[group_ids]) ** 2
+                squares = np.bincount(group_ids, weights=deviations, minlength=ngroups)
+                result = np.sqrt(squares / (counts - ddof))
+            else:
+                result = np.full(ngroups, np.inf if how == "min" else -np.inf)
+                getattr(np, "minimum" if how == "min" else "maximum").at(
+                    result, group_ids, values
+                )
+        result[counts < (min_count if how == "sum" else 1)] = np.nan
+        return type(self)(result, self.dtype)
+
+
+def _unit_of(physical: Physical) -> Physical:
+    """
+    Returns the Physical of one unit of the units of 'physical' (e.g. 1 kip).
+    """
+    return Physical(1 / physical.factor, physical.dimensions, physical.factor)
+
+
+def _units_string(unit: Physical) -> str:
+    """
+    Returns the units of 'unit' as a str that parse_units() can parse, e.g. "kip/ft".
+    """
+    return repr(_unit_of(unit)).split(" ", 1)[1]
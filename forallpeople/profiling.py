@@ -0,0 +1,212 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Opt-in instrumentation of the Physical methods, the Environment and the
+functions in physical_helper_functions: counts the calls and accumulates the
+wall time of each.
+
+    with si.profile() as profiler:
+        ...  # calculations
+    log.info(profiler.snapshot())
+
+The profiler can also be switched on and off globally with
+si.profiler.enable() and si.profiler.disable(). While it is disabled, the
+original functions are in place so the instrumentation costs nothing.
+"""
+
+import contextlib
+import functools
+import threading
+import time
+
+# Methods of Physical that are never instrumented
+_SKIP_METHODS = {"__setattr__", "__delattr__", "__getattr__", "__init_subclass__"}
+
+# Functions whose falsy results are counted as "misses"
+_COUNT_MISSES = {"phf._get_units_by_factor"}
+
+
+class Profiler:
+    """
+    A class that counts the calls and accumulates the wall time (including the
+    time spent in nested calls) of each Physical method, Environment method, and
+    physical_helper_functions function while it is enabled. Calls to .enable() and
+    .disable() may be nested; the instrumentation is removed when the outermost
+    .disable() is called.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._originals = []
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._depth > 0
+
+    def enable(self) -> None:
+        """
+        Returns None. Instruments the targets on the first (outermost) call.
+        """
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self._instrument()
+
+    def disable(self) -> None:
+        """
+        Returns None. Restores the original targets on the last (outermost) call.
+        """
+        with self._lock:
+            if not self._depth:
+                return
+            self._depth -= 1
+            if not self._depth:
+                self._restore()
+
+    def reset(self) -> None:
+        """
+        Returns None. Clears the counters.
+        """
+        self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Returns a dict of {name: {"calls": int, "seconds": float}} of the counters,
+        sorted by descending total time. Functions in _COUNT_MISSES also have a
+        "misses" entry. The dict contains only builtin types and can be logged or
+        dumped to JSON.
+        """
+        snapshot = {}
+        for name, (calls, seconds, misses) in sorted(
+            list(self._counters.items()), key=lambda item: -item[1][1]
+        ):
+            snapshot[name] = {"calls": calls, "seconds": seconds}
+            if name in _COUNT_MISSES:
+                snapshot[name]["misses"] = misses
+        return snapshot
+
+    def format(self) -> str:
+        """
+        Returns a str table of .snapshot().
+        """
+        lines = [f"{'operation':<40}{'calls':>10}{'total ms':>12}{'µs/call':>10}"]
+        for name, counter in self.snapshot().items():
+            calls, seconds = counter["calls"], counter["seconds"]
+            line = (
+                f"{name:<40}{calls:>10}{seconds * 1e3:>12.3f}"
+                f"{seconds / calls * 1e6:>10.2f}"
+            )
+            if "misses" in counter:
+                line += f"  ({counter['misses']} misses)"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def _instrument(self) -> None:
+        """
+        Returns None. Replaces each target with a timed wrapper and remembers the
+        original so that it can be restored.
+        """
+        for owner, attr, name in _targets():
+            original = owner.__dict__[attr]
+            if isinstance(original, (classmethod, staticmethod)):
+                wrapped = type(original)(self._timed(name, original.__func__))
+            else:
+                wrapped = self._timed(name, original)
+            setattr(owner, attr, wrapped)
+            self._originals.append((owner, attr, original))
+
+    def _restore(self) -> None:
+        """
+        Returns None. Puts back the original targets.
+        """
+        for owner, attr, original in reversed(self._originals):
+            setattr(owner, attr, original)
+        self._originals.clear()
+
+    def _timed(self, name: str, func):
+        """
+        Returns a wrapper of 'func' that records its calls and wall time under 'name'.
+        """
+        counters = self._counters
+        perf_counter = time.perf_counter
+        count_misses = name in _COUNT_MISSES
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                counter = counters.get(name)
+                if counter is None:
+                    counter = counters.setdefault(name, [0, 0.0, 0])
+                counter[0] += 1
+                counter[1] += perf_counter() - start
+            if count_misses and not result:
+                counter[2] += 1
+            return result
+
+        return wrapper
+
+
+def _targets() -> list:
+    """
+    Returns a list of (owner, attribute, name) tuples of everything instrumented
+    by the Profiler. The owners are the Physical class, the Environment class, and
+    the physical_helper_functions module.
+    """
+    from forallpeople import Physical
+    from forallpeople.si_environment import Environment
+    import forallpeople.physical_helper_functions as phf
+
+    targets = []
+    for attr, value in vars(Physical).items():
+        if attr in _SKIP_METHODS:
+            continue
+        if callable(value) or isinstance(value, (classmethod, staticmethod)):
+            targets.append((Physical, attr, f"Physical.{attr}"))
+    for attr in ("__call__", "powers_of_derived"):
+        targets.append((Environment, attr, f"Environment.{attr}"))
+    for attr, value in vars(phf).items():
+        if callable(value) and getattr(value, "__module__", None) == phf.__name__:
+            targets.append((phf, attr, f"phf.{attr}"))
+    return targets
+
+
+profiler = Profiler()
+
+
+@contextlib.contextmanager
+def profile(reset: bool = True):
+    """
+    Returns a context manager that enables the global profiler for the duration of
+    the block and yields it. The counters are cleared first unless 'reset' is False.
+    """
+    if reset:
+        profiler.reset()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
@@ -13,13 +13,208 @@
 #    limitations under the License.
 
 
-from collections import ChainMap
+from collections import ChainMap, namedtuple
+import ast
+import contextlib
+import contextvars
+import functools
+import hashlib
+import itertools
+import os
 import pathlib
+import pickle
 import json
-import re
+import operator
 import sys
+import threading
 from types import ModuleType
+from typing import Optional, Union
 from forallpeople.dimensions import Dimensions
+import forallpeople.physical_helper_functions as phf
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "currsize"])
+
+# Each CompiledEnvironment gets a unique version number
+_versions = itertools.count(1)
+
+# The CompiledEnvironment set by Environment.using() in the current thread/task
+_context_environment = contextvars.ContextVar("context_environment", default=None)
+
+# Increment if the layout of the persisted environment files changes
+_SIDECAR_FORMAT = 1
+
+
+_FACTOR_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+# The ast node of a number literal and its field holding the number (number
+# literals are parsed as ast.Num before Python 3.8)
+if sys.version_info >= (3, 8):
+    _NUMBER_NODE, _NUMBER_FIELD = ast.Constant, "value"
+else:
+    _NUMBER_NODE, _NUMBER_FIELD = ast.Num, "n"
+
+# Largest number of entries kept in each of the caches keyed by Dimensions
+# (e.g. .powers_cache), which could otherwise grow without bound
+_MAX_CACHE_ENTRIES = 10000
+
+# Largest exponent allowed in a Factor expression (keeps "9**9**9" from hanging)
+_MAX_FACTOR_EXPONENT = 1000
+
+# Largest int (in bits) that a power in a Factor expression may produce (keeps
+# nested powers, e.g. "((10**1000)**1000)**20", from hanging)
+_MAX_FACTOR_BITS = 4096
+
+
+@functools.lru_cache(maxsize=None)
+def _eval_factor(expr: str) -> Union[int, float]:
+    """
+    Returns the number resulting from evaluating 'expr', an arithmetic expression
+    of int and float literals, parentheses, and the operators + - * / **, as
+    Python would. Raises ValueError if 'expr' contains anything else.
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as err:
+        raise ValueError(f"Invalid arithmetic expression: '{expr}'") from err
+    try:
+        return _eval_factor_node(tree.body, expr)
+    except ArithmeticError as err:
+        raise ValueError(f"Cannot evaluate arithmetic expression: '{expr}'") from err
+
+
+def _eval_factor_node(node: ast.AST, expr: str) -> Union[int, float]:
+    """
+    Returns the number resulting from evaluating the ast 'node' of the Factor
+    expression, 'expr'. Raises ValueError for any node that is not a number or one
+    of the arithmetic operators in _FACTOR_OPERATORS.
+    """
+    if isinstance(node, _NUMBER_NODE):
+        value = getattr(node, _NUMBER_FIELD)
+        if type(value) in (int, float):
+            return value
+    elif isinstance(node, ast.UnaryOp) and type(node.op) in _FACTOR_OPERATORS:
+        return _FACTOR_OPERATORS[type(node.op)](_eval_factor_node(node.operand, expr))
+    elif isinstance(node, ast.BinOp) and type(node.op) in _FACTOR_OPERATORS:
+        left = _eval_factor_node(node.left, expr)
+        right = _eval_factor_node(node.right, expr)
+        if type(node.op) is ast.Pow and (
+            abs(right) > _MAX_FACTOR_EXPONENT
+            or type(left) is int
+            and type(right) is int
+            and left.bit_length() * right > _MAX_FACTOR_BITS
+        ):
+            raise ValueError(f"Exponent too large in arithmetic expression: '{expr}'")
+        return _FACTOR_OPERATORS[type(node.op)](left, right)
+    raise ValueError(f"Invalid arithmetic expression: '{expr}'")
+
+
+class CompiledEnvironment:
+    """
+    A class that contains a parsed units environment: the unit definitions of an
+    environment .json file, the index tables derived from them, and the caches of
+    results computed against them. Instances are kept by the Environment (and may
+    be persisted to disk) so that loading an environment again does not re-read,
+    re-evaluate, or re-index the .json file.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        definitions: dict,
+        units_by_dimension: dict,
+        units_by_factor: dict,
+        parallel_index: dict,
+        stamp: tuple = (),
+    ):
+        self.name = name
+        self.definitions = definitions
+        self.units_by_dimension = units_by_dimension
+        self.units_by_factor = units_by_factor
+        self.parallel_index = parallel_index
+        self.stamp = stamp  # (st_mtime_ns, st_size, sha256) of the .json file
+        self.version = next(_versions)
+        self.units_dict = {}  # The Physical instances; generated on first use
+        self.powers_cache = {}
+        # Hits and misses of .powers_cache, counted with next() (atomic, unlike
+        # += 1, when threads share the environment) and read by cache_stats()
+        self.powers_hits = itertools.count()
+        self.powers_misses = itertools.count()
+        self._stats_reads = 0
+        self._stats_lock = threading.Lock()
+        self.repr_cache = {}
+        self.parse_cache = {}  # Unit strings parsed by forallpeople.parsing
+        self.unchecked_cache = {}  # Units of results (see unchecked_mode)
+        self.unit_names = None  # The names that can be parsed; generated on first use
+
+    @classmethod
+    def from_definitions(
+        cls, name: str, definitions: dict, total_precision: int, stamp: tuple = ()
+    ):
+        """
+        Returns a CompiledEnvironment for the loaded unit 'definitions' (as returned
+        by Environment._load_environment) after building its index tables.
+        """
+        units_by_dimension = {"derived": dict(), "defined": dict()}
+        units_by_factor = dict()
+        for unit_name, definition in definitions.items():
+            factor = round(definition.get("Factor", 1), total_precision)
+            dimension = definition.get("Dimension")
+            value = definition.get("Value", 1)
+            if factor == 1 and value == 1:
+                units_by_dimension["derived"].setdefault(dimension, dict()).update(
+                    {unit_name: definition}
+                )
+            elif factor != 1:
+                units_by_dimension["defined"].setdefault(dimension, dict()).update(
+                    {unit_name: definition}
+                )
+                units_by_factor.update({factor: {unit_name: definition}})
+        parallel_index = phf._build_parallel_index(units_by_dimension)
+        return cls(
+            name, definitions, units_by_dimension, units_by_factor, parallel_index, stamp
+        )
+
+    def cache_stats(self) -> tuple:
+        """
+        Returns a tuple of the hits and misses of .powers_cache.
+        """
+        with self._stats_lock:
+            # Reading a count advances it, so each read is subtracted
+            hits = next(self.powers_hits) - self._stats_reads
+            misses = next(self.powers_misses) - self._stats_reads
+            self._stats_reads += 1
+        return hits, misses
+
+    def cache_stats_clear(self) -> None:
+        """
+        Returns None. Resets the hits and misses of .powers_cache.
+        """
+        with self._stats_lock:
+            self.powers_hits = itertools.count()
+            self.powers_misses = itertools.count()
+            self._stats_reads = 0
+
+    def tables(self) -> dict:
+        """
+        Returns a dict of the definitions and index tables, i.e. everything but
+        the caches, for persisting to disk.
+        """
+        return {
+            "format": _SIDECAR_FORMAT,
+            "stamp": self.stamp,
+            "definitions": self.definitions,
+            "units_by_dimension": self.units_by_dimension,
+            "units_by_factor": self.units_by_factor,
+            "parallel_index": self.parallel_index,
+        }
 
 
 class Environment:
@@ -27,6 +222,24 @@ class Environment:
     A class that contains information about the units definitions that will be used
     by each Physical instance. Each Physical instance requests units definition
     information from the single Environment instance (OMG! Singleton!)
+
+    Each environment is compiled once (see CompiledEnvironment) and kept in memory
+    so that switching back to it is cheap. If .cache_dir is set (it defaults to
+    the FORALLPEOPLE_CACHE_DIR environment variable), compiled environments are
+    also persisted there as pickle files, keyed by the modification time and hash
+    of their .json file, so that new processes can skip the parsing as well.
+    Only point .cache_dir at a directory you trust: the files are unpickled.
+
+    An environment loaded with lazy=True is not pushed into the forallpeople
+    module namespace: instead, each unit is generated the first time it is
+    accessed (through the module's __getattr__) and is kept for later, so
+    switching environments does not create or delete any module attributes.
+    The builtins namespace cannot be populated lazily so top_level=True always
+    pushes every unit.
+
+    The environment used by Physical instances can also be set for the current
+    thread or asyncio task only with .using() (see contextvars); the environment
+    loaded with .__call__() is used wherever .using() is not in effect.
     """
 
     environment = {}
@@ -34,17 +247,24 @@ class Environment:
     def __init__(
         self, physical_class: type, builtins_module: ModuleType, si_base_units: dict
     ):
-        self.units_by_dimension = {"derived": dict(), "defined": dict()}
-        self.units_by_factor = dict()
         self._physical_class = physical_class
         self._builtins_module = builtins_module
         self._si_base_units = si_base_units
         self.this_module = sys.modules["forallpeople"]
         self.push_module = None
+        self.lazy_environment = None
+        self.cache_dir = os.environ.get("FORALLPEOPLE_CACHE_DIR")
+        self._compiled = {}
+        self._compile_lock = threading.Lock()
+        no_environment = CompiledEnvironment.from_definitions(
+            "", {}, self._physical_class._total_precision
+        )
+        no_environment.version = 0
+        self._activate(no_environment)
         if not self.environment:
             self.environment = self._si_base_units
 
-    def __call__(self, env_name: str = "", top_level: bool = False):
+    def __call__(self, env_name: str = "", top_level: bool = False, lazy: bool = False):
         if not env_name:
             try:
                 print(
@@ -61,38 +281,257 @@ class Environment:
             push_module = self._builtins_module
 
         if self.environment != self._si_base_units and self.push_module:
-            old_units_dict = self._generate_units_dict(
-                self.environment, self._physical_class
+            self.del_vars(self.environment, self.push_module)
+
+        compiled = self._compile_environment(env_name)
+        self.push_vars(self._si_base_units, push_module)
+        if lazy and not top_level:
+            self.lazy_environment = compiled
+            push_module = None  # Nothing to delete on the next switch
+        else:
+            self.lazy_environment = None
+            for unit_name in compiled.definitions:
+                self._get_unit(compiled, unit_name)
+            self.push_vars(compiled.units_dict, push_module)
+
+        # Update internal class dictionaries: self.units_by_dimension, self.units_by_factor
+        self._activate(compiled)
+        self.push_module = push_module  # Update previous push_module; could be either module or top-level
+
+    def lazy_unit(self, unit_name: str):
+        """
+        Returns the Physical for 'unit_name' in the environment loaded with
+        lazy=True, generating it on first access. Raises AttributeError if there
+        is no lazy environment or it does not define 'unit_name'.
+        """
+        compiled = self.lazy_environment
+        if compiled is None or unit_name not in compiled.definitions:
+            raise AttributeError(
+                f"module 'forallpeople' has no attribute '{unit_name}'"
             )
+        return self._get_unit(compiled, unit_name)
+
+    def lazy_units(self) -> list:
+        """
+        Returns a list of the unit names available from the environment loaded
+        with lazy=True (empty if there is none).
+        """
+        if self.lazy_environment is None:
+            return []
+        return list(self.lazy_environment.definitions)
 
-            self.del_vars(old_units_dict, self.push_module)
+    def _get_unit(self, compiled: CompiledEnvironment, unit_name: str):
+        """
+        Returns the Physical for 'unit_name' in 'compiled', generating it and storing
+        it in compiled.units_dict if it does not exist yet.
+        """
+        try:
+            return compiled.units_dict[unit_name]
+        except KeyError:
+            unit = self._generate_unit(
+                compiled.definitions[unit_name], self._physical_class
+            )
+            compiled.units_dict[unit_name] = unit
+            return unit
 
-        self.environment = self._load_environment(env_name)
-        new_units_dict = self._generate_units_dict(
-            self.environment, self._physical_class
+    def _activate(self, compiled: CompiledEnvironment) -> None:
+        """
+        Returns None. Makes 'compiled' the environment used by Physical instances
+        (outside of any .using() block).
+        """
+        self.environment = compiled.definitions
+        self._global_environment = compiled
+
+    @contextlib.contextmanager
+    def using(self, env: Union[str, CompiledEnvironment]):
+        """
+        Returns a context manager that makes 'env', an environment name or a
+        CompiledEnvironment (e.g. from .snapshot()), the environment used by Physical
+        instances in the current thread or asyncio task until the block exits. Other
+        threads and tasks are not affected and no units are pushed into any namespace.
+        Yields the CompiledEnvironment.
+
+        e.g.
+        with si.using("structural"):
+            print(load)
+        """
+        if isinstance(env, str):
+            env = self._compile_environment(env)
+        token = _context_environment.set(env)
+        try:
+            yield env
+        finally:
+            _context_environment.reset(token)
+
+    def snapshot(self) -> CompiledEnvironment:
+        """
+        Returns the CompiledEnvironment currently used by Physical instances in this
+        thread or task, e.g. to pass to .using() elsewhere.
+        """
+        return _context_environment.get() or self._global_environment
+
+    @property
+    def units_by_dimension(self) -> dict:
+        return self.snapshot().units_by_dimension
+
+    @property
+    def units_by_factor(self) -> dict:
+        return self.snapshot().units_by_factor
+
+    @property
+    def parallel_index(self) -> dict:
+        return self.snapshot().parallel_index
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    @property
+    def _powers_cache(self) -> dict:
+        return self.snapshot().powers_cache
+
+    def _compile_environment(self, env_name: str) -> CompiledEnvironment:
+        """
+        Returns the CompiledEnvironment for 'env_name'. The one already in memory, or
+        else the one persisted in .cache_dir, is reused if the .json file has not
+        changed since it was compiled. Otherwise, the .json file is loaded and
+        compiled (and persisted, if .cache_dir is set).
+        """
+        file_path = self._environment_path(env_name)
+        stat = file_path.stat()
+        file_stamp = (stat.st_mtime_ns, stat.st_size)
+        compiled = self._compiled.get(env_name)
+        if compiled is not None and compiled.stamp[:2] == file_stamp:
+            return compiled
+        with self._compile_lock:
+            compiled = self._compiled.get(env_name)
+            if compiled is not None and compiled.stamp[:2] == file_stamp:
+                return compiled
+            return self._compile_new_environment(env_name, file_stamp)
+
+    def _compile_new_environment(
+        self, env_name: str, file_stamp: tuple
+    ) -> CompiledEnvironment:
+        """
+        Returns a new CompiledEnvironment for 'env_name', read from .cache_dir or
+        compiled from the .json file, and stores it for re-use.
+        """
+        file_path = self._environment_path(env_name)
+        compiled = self._read_compiled(env_name, file_stamp)
+        if compiled is None:
+            definitions = self._load_environment(env_name)
+            digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+            compiled = CompiledEnvironment.from_definitions(
+                env_name,
+                definitions,
+                self._physical_class._total_precision,
+                file_stamp + (digest,),
+            )
+            self._write_compiled(compiled)
+        self._compiled[env_name] = compiled
+        return compiled
+
+    def _compiled_path(self, env_name: str) -> Optional[pathlib.Path]:
+        """
+        Returns the path of the persisted CompiledEnvironment for 'env_name' in
+        .cache_dir or None if .cache_dir is not set.
+        """
+        if not self.cache_dir:
+            return None
+        return pathlib.Path(self.cache_dir) / f"{env_name}.environment.pickle"
+
+    def _read_compiled(
+        self, env_name: str, file_stamp: tuple
+    ) -> Optional[CompiledEnvironment]:
+        """
+        Returns the CompiledEnvironment for 'env_name' persisted in .cache_dir if it
+        exists and was compiled from the current .json file. Returns None otherwise.
+        """
+        compiled_path = self._compiled_path(env_name)
+        if compiled_path is None or not compiled_path.exists():
+            return None
+        try:
+            with open(compiled_path, "rb") as compiled_file:
+                tables = pickle.load(compiled_file)
+            mtime_ns, size, digest = tables["stamp"]
+            if tables["format"] != _SIDECAR_FORMAT:
+                return None
+        except Exception:  # Unreadable or outdated: compile from the .json file
+            return None
+        if (mtime_ns, size) != file_stamp:
+            file_bytes = self._environment_path(env_name).read_bytes()
+            if hashlib.sha256(file_bytes).hexdigest() != digest:
+                return None
+        return CompiledEnvironment(
+            env_name,
+            tables["definitions"],
+            tables["units_by_dimension"],
+            tables["units_by_factor"],
+            tables["parallel_index"],
+            file_stamp + (digest,),
         )
-        self.push_vars(new_units_dict, push_module)
-        self.push_vars(self._si_base_units, push_module)
 
-        # Update internal class dictionaries: self.units_by_dimension, self.units_by_factor
-        self.units_by_dimension = {"derived": dict(), "defined": dict()}
-        self.units_by_factor = dict()
-        for name, definition in self.environment.items():
-            factor = round(
-                definition.get("Factor", 1), self._physical_class._total_precision
+    def _write_compiled(self, compiled: CompiledEnvironment) -> None:
+        """
+        Returns None. Persists 'compiled' in .cache_dir, if it is set. Failures to
+        write are ignored since the file is only a cache.
+        """
+        compiled_path = self._compiled_path(compiled.name)
+        if compiled_path is None:
+            return
+        temp_path = compiled_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            compiled_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "wb") as compiled_file:
+                pickle.dump(compiled.tables(), compiled_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, compiled_path)
+        except OSError:
+            pass
+
+    def powers_of_derived(self, dims: Dimensions) -> tuple:
+        """
+        Returns the (power, base_dimensions) tuple of phf._powers_of_derived for 'dims'
+        against the units currently loaded. Results are cached per (version, dims)
+        in the CompiledEnvironment, so each loaded environment has its own cache
+        (and its own statistics, see .cache_info()).
+        """
+        compiled = self.snapshot()
+        key = (compiled.version, dims._key)
+        try:
+            result = compiled.powers_cache[key]
+        except KeyError:
+            next(compiled.powers_misses)
+            result = phf._powers_of_derived(
+                dims, compiled.units_by_dimension, compiled.parallel_index
             )
-            dimension = definition.get("Dimension")
-            value = definition.get("Value", 1)
-            if factor == 1 and value == 1:
-                self.units_by_dimension["derived"].setdefault(dimension, dict()).update(
-                    {name: definition}
-                )
-            elif factor != 1:
-                self.units_by_dimension["defined"].setdefault(dimension, dict()).update(
-                    {name: definition}
-                )
-                self.units_by_factor.update({factor: {name: definition}})
-        self.push_module = push_module  # Update previous push_module; could be either module or top-level
+            if len(compiled.powers_cache) < _MAX_CACHE_ENTRIES:
+                compiled.powers_cache[key] = result
+            return result
+        next(compiled.powers_hits)
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Returns a CacheInfo namedtuple of the hits, misses, and current size of the
+        dimension-analysis cache used by .powers_of_derived() in the current
+        environment (see .snapshot()).
+        """
+        compiled = self.snapshot()
+        return CacheInfo(*compiled.cache_stats(), len(compiled.powers_cache))
+
+    def cache_clear(self) -> None:
+        """
+        Returns None. Empties the dimension-analysis cache (and the caches of unit
+        strings used by Physical.__repr__, of parsed unit strings, and of units used
+        by si.unchecked()) and resets its statistics.
+        """
+        self._powers_cache.clear()
+        # A new dict (rather than .clear()) so that the repr caches of the
+        # Physical unit descriptors, which are tied to this dict, are dropped too
+        self.snapshot().repr_cache = {}
+        self.snapshot().parse_cache.clear()
+        self.snapshot().unchecked_cache.clear()
+        self.snapshot().cache_stats_clear()
 
     
     def push_vars(self, units_dict: dict, module: ModuleType) -> None:
@@ -114,19 +553,16 @@ class Environment:
             " .json file, '{env_name}.json', for unit '{unit}'"
         )
         unit_factor_not_eval = (
-            "Unit definition in '{env_name}.json': Factor"
-            "must be an arithmetic expr (as a str), a float,"
+            "Unit definition in '{env_name}.json': Factor "
+            "must be an arithmetic expr (as a str), a float, "
             "or an int: not '{factor}'."
         )
 
-        path = pathlib.Path(__file__).parent
-        filename = env_name + ".json"
-        file_path = path / filename
+        file_path = self._environment_path(env_name)
         with open(file_path, "r", encoding="utf-8") as json_unit_definitions:
             units_environment = json.load(json_unit_definitions)
 
         # Load definitions
-        arithmetic_expr = re.compile(r"[0-9.*/+-]")
         for unit, definitions in units_environment.items():
             dimensions = definitions.get("Dimension", ())
             factor = definitions.get("Factor", "1")
@@ -136,13 +572,21 @@ class Environment:
             else:
                 units_environment[unit]["Dimension"] = Dimensions(*dimensions)
 
-            if type(factor) is str and not arithmetic_expr.match(factor):
-                raise ValueError(unit_factor_not_eval.format(unit, env_name, factor))
-            else:
-                factor = str(factor)
-                units_environment[unit]["Factor"] = eval(factor)
+            try:
+                units_environment[unit]["Factor"] = _eval_factor(str(factor))
+            except ValueError as err:
+                raise ValueError(
+                    unit_factor_not_eval.format(env_name=env_name, factor=factor)
+                ) from err
         return units_environment
 
+    @staticmethod
+    def _environment_path(env_name: str) -> pathlib.Path:
+        """
+        Returns the path of the JSON file that defines the environment, 'env_name'.
+        """
+        return pathlib.Path(__file__).parent / (env_name + ".json")
+
     @staticmethod
     def _generate_units_dict(environment: dict, physical_class):
         """
@@ -153,16 +597,23 @@ class Environment:
         units_dict = {}
         # Transfer definitions
         for unit, definitions in environment.items():
-            dimensions = definitions["Dimension"]
-            factor = definitions.get("Factor", 1)
-            symbol = definitions.get("Symbol", "")
-            value = definitions.get("Value", 1)
-            if symbol:
-                units_dict.update(
-                    {unit: physical_class(1 / factor, dimensions, factor)}
-                )
-            else:
-                units_dict.update({unit: physical_class(value, dimensions, factor)})
+            units_dict.update(
+                {unit: Environment._generate_unit(definitions, physical_class)}
+            )
         return units_dict
 
+    @staticmethod
+    def _generate_unit(definitions: dict, physical_class):
+        """
+        Returns the Physical instance for a single unit, as described by its
+        'definitions' dict in the environment json file.
+        """
+        dimensions = definitions["Dimension"]
+        factor = definitions.get("Factor", 1)
+        symbol = definitions.get("Symbol", "")
+        value = definitions.get("Value", 1)
+        if symbol:
+            return physical_class(1 / factor, dimensions, factor)
+        return physical_class(value, dimensions, factor)
+
 
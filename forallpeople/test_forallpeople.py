@@ -12,9 +12,12 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import pickle
 import pytest
 import forallpeople as si
 import forallpeople.physical_helper_functions as phf
+import forallpeople.dimensions as dimensions
+from forallpeople.si_environment import _eval_factor
 
 si.environment("test_definitions", top_level = True)
 
@@ -184,6 +187,29 @@ def test_sqrt():
     assert (25 * m / s).sqrt() == 5 * (m ** 0.5 / (s ** 0.5))
 
 
+def test__new():
+    force = si.Physical._new(1500.0, N.dimensions, 1, 4, "")
+    assert force.repr == si.Physical(1500.0, N.dimensions, 1, 4).repr
+    assert type(kN + kN) is si.Physical
+    with pytest.raises(AttributeError):
+        force.value = 1.0
+
+
+def test__unit_descriptor():
+    assert (3 * kip)._unit is (4 * kip)._unit is kip._unit
+    assert (3 * kip + 1 * kip)._unit is kip._unit
+    assert (3 * kip).factor == kip.factor and (3 * kip).precision == 3
+    assert "factor=1," in si.Physical(1, N.dimensions, 1).repr
+    unpickled = si._physical_from_descriptor(2.0, (kip.dimensions, kip.factor, 3, ""))
+    assert unpickled.value == 2.0 and unpickled._unit is kip._unit
+    assert repr(2 * kip) == "2.000 kip" and kip._unit.repr_caches
+    si.environment.cache_clear()
+    assert repr(2 * kip) == "2.000 kip"
+    with pytest.raises(AttributeError):
+        kip._unit.factor = 1
+    assert repr(5 * kip) == "5.000 kip"
+
+
 def test_in_units():
     assert ft.to("m").factor == 1.0
     assert m.to("ft").factor == 1 / 0.3048
@@ -230,6 +256,59 @@ def test__dims_quotient():
     )
 
 
+def test__build_parallel_index():
+    index = phf._build_parallel_index(env_dims)
+    dims = si.Dimensions
+    assert index[phf._parallel_key(dims(0, 1, 0, 0, 0, 0, 0))] == (
+        dims(0, 1, 0, 0, 0, 0, 0),
+    )
+    for test_dims in (
+        dims(1, 1, -2, 0, 0, 0, 0),
+        dims(-2, -2, 4, 0, 0, 0, 0),
+        dims(0, -1, 0, 0, 0, 0, 0),
+        dims(3.6, 3.6, -7.2, 0, 0, 0, 0),
+        dims(0.5, -0.5, -1, 0, 0, 0, 0),
+        dims(1, 1, 1, 1, 1, 1, 1),
+        dims(0, 0, 0, 0, 0, 0, 0),
+    ):
+        assert phf._dims_quotient(test_dims, env_dims, index) == phf._dims_quotient(
+            test_dims, env_dims
+        )
+
+
+def test_dimensions_arithmetic():
+    vec = si.vec
+    d1 = si.Dimensions(1, 1, -2, 0, 0, 0, 0)
+    d2 = si.Dimensions(0, 2, 0, 0.5, 0, 0, 0)
+    assert d1.add(d2) == vec.add(d1, d2)
+    assert d1.subtract(d2) == vec.subtract(d1, d2)
+    assert d1.multiply(-1.5) == vec.multiply(d1, -1.5)
+    assert d1.divide(d1, ignore_zeros=True) == vec.divide(d1, d1, ignore_zeros=True)
+    assert repr(d1.divide(d2)) == repr(vec.divide(d1, d2))
+    assert type(d1.add(d2)) is si.Dimensions
+
+
+def test_dimensions_interned():
+    d1 = si.Dimensions(1, 1, -2, 0, 0, 0, 0)
+    assert si.Dimensions(kg=1, m=1, s=-2, A=0, cd=0, K=0, mol=0) is d1
+    assert d1.add(si.Dimensions(0, 0, 0, 0, 0, 0, 0)) is d1
+    assert (N * m / m).dimensions is N.dimensions
+    assert d1._replace(kg=1) is d1
+    assert d1._key == si.Dimensions(1, 1, -2, 0, 0, 0, 0)._key
+    assert d1._key != si.Dimensions(1, 1, -2, 0, 0, 0, 1)._key
+    d2 = si.Dimensions(1.0, 1, -2, 0, 0, 0, 0)
+    assert d2 is not d1 and d2 == d1 and hash(d2) == hash(d1)
+    assert repr(d2) == "Dimensions(kg=1.0, m=1, s=-2, A=0, cd=0, K=0, mol=0)"
+    d3 = si.Dimensions(0.5, 0, 0, 0, 0, 0, 0)
+    assert si.Dimensions(0.5, 0, 0, 0, 0, 0, 0) is d3
+    assert (kg ** 0.5).dimensions is (kg ** 0.5).dimensions == d3
+    interned = len(dimensions._interned_other)
+    for power in range(dimensions._MAX_INTERNED + 10):
+        si.Dimensions(1 + power / 1e5, 0, 0, 0, 0, 0, 0)
+    assert len(dimensions._interned_other) == max(interned, dimensions._MAX_INTERNED)
+    assert si.Dimensions(0.5, 0, 0, 0, 0, 0, 0) is d3
+
+
 def test__dims_basis_multiple():
     func = phf._dims_basis_multiple
     assert func(si.Dimensions(0, 1, 0, 0, 0, 0, 0)) == si.Dimensions(
@@ -296,6 +375,29 @@ def test__auto_prefix_value():
     assert func(1.5e-5, 2) == pytest.approx(15)
 
 
+def test__prefix_index():
+    func = phf._prefix_index
+    table = phf._prefix_table
+    assert table[func(1500, 1)][0] == "k"
+    assert table[func(1500, 1, kg=True)][0] == "M"
+    assert table[func(1.5e-7, 0.5)][0] == "f"
+    assert func(1e-30, 1) == -1
+    assert func(float("nan"), 1) is None
+    assert phf._auto_prefix(5e42, 14) == "k"
+    assert repr(si.Physical(float("nan"), kN.dimensions, 1)) == "nan N"
+
+
+def test__auto_prefix_array():
+    np = pytest.importorskip("numpy")
+    values = [1500, 1.5e6, 1.5e-3, 1.5e-5, 0.0, -52500]
+    for power, kg in ((1, False), (2, False), (-1, False), (1, True)):
+        prefixes, scaled = phf._auto_prefix_array(values, power, kg)
+        assert list(prefixes) == [phf._auto_prefix(v, power, kg) for v in values]
+        assert scaled == pytest.approx(
+            [phf._auto_prefix_value(v, power, kg=kg) for v in values]
+        )
+
+
 def test___eq__():
     assert m == m
     assert m == 1
@@ -492,3 +594,605 @@ def test_defined_unit_persistence():
     )
     assert repr(c) == "0.072 ksf"
     assert repr(g) == "1653.380 lb"
+
+
+## Tests of the Environment caches ##
+
+
+def test_powers_of_derived_cache():
+    si.environment.cache_clear()
+    dims = si.Dimensions(2, 2, -4, 0, 0, 0, 0)
+    assert si.environment.powers_of_derived(dims) == phf._powers_of_derived(
+        dims, env_dims
+    )
+    si.environment.powers_of_derived(dims)
+    hits, misses, currsize = si.environment.cache_info()
+    assert (hits, misses, currsize) == (1, 1, 1)
+    with si.environment.using("default"):
+        si.environment.cache_clear()
+        si.environment.powers_of_derived(dims)
+        assert si.environment.cache_info() == (0, 1, 1)
+        si.environment.cache_clear()
+    assert si.environment.cache_info() == (1, 1, 1)
+
+
+def test_repr_cache():
+    si.environment.cache_clear()
+    assert repr(5200 * N) == "5.200 kN"
+    assert repr(5200 * N) == "5.200 kN"
+    assert repr(5.2 * N) == "5.200 N"
+    assert (5200 * N).latex == "5.200\\ \\text{kN}"
+    assert repr(m ** 2.0 / s ** 2.0) == "1.000 m²'⁰·s⁻²'⁰"
+    assert repr(m ** 2 / s ** 2) == "1.000 m²·s⁻²"
+
+
+def test_powers_of_derived_cache_invalidation():
+    version = si.environment.version
+    N * N
+    assert si.environment.cache_info().currsize
+    si.environment("test_definitions", top_level=True)
+    assert si.environment.version == version
+    assert si.environment.cache_info().currsize
+    si.environment("default")
+    assert si.environment.version != version
+    assert si.environment.cache_info().currsize == 0
+    si.environment("test_definitions", top_level=True)
+    assert si.environment.version == version
+    assert si.environment.cache_info().currsize
+
+
+def test_compiled_environment_persisted(tmp_path, monkeypatch):
+    env = si.environment
+    monkeypatch.setattr(env, "cache_dir", str(tmp_path))
+    monkeypatch.setattr(env, "_compiled", {})
+    env("test_definitions", top_level=True)
+    compiled = env._compiled["test_definitions"]
+    assert (tmp_path / "test_definitions.environment.pickle").exists()
+
+    def fail(env_name):
+        raise AssertionError("JSON file re-loaded")
+
+    monkeypatch.setattr(env, "_load_environment", fail)
+    env._compiled.clear()
+    env("test_definitions", top_level=True)
+    reloaded = env._compiled["test_definitions"]
+    assert reloaded is not compiled
+    assert reloaded.definitions == compiled.definitions
+    assert reloaded.units_by_factor == compiled.units_by_factor
+    assert env.powers_of_derived(N.dimensions) == (1, N.dimensions)
+    assert repr(N * m) == "1.000 N·m"
+
+    file_stamp = reloaded.stamp[:2]
+    assert env._read_compiled("test_definitions", file_stamp) is not None
+    touched_stamp = (file_stamp[0] + 1, file_stamp[1])
+    assert env._read_compiled("test_definitions", touched_stamp) is not None
+    tables = reloaded.tables()
+    tables["stamp"] = touched_stamp + ("0" * 64,)
+    with open(tmp_path / "test_definitions.environment.pickle", "wb") as file:
+        pickle.dump(tables, file)
+    assert env._read_compiled("test_definitions", file_stamp) is None
+
+
+def test_lazy_environment():
+    newton = N
+    si.environment("default", lazy=True)
+    assert "N" not in vars(si)
+    assert si.N == newton
+    assert si.N is si.N
+    assert repr(si.Pa * si.m**2) == "1.000 N"
+    assert "N" in dir(si) and "Physical" in dir(si)
+    with pytest.raises(AttributeError):
+        si.not_a_unit
+    si.environment("test_definitions", top_level=True)
+    with pytest.raises(AttributeError):
+        si.N
+    si.environment("default")
+    assert "N" in vars(si)
+    si.environment("default", lazy=True)
+    assert "N" not in vars(si)
+    si.environment("test_definitions", top_level=True)
+
+
+def test_using():
+    import threading
+
+    assert repr(N * m) == "1.000 N·m"
+    with si.using("default") as default:
+        assert repr(N * m) == "1.000 J"
+        assert si.environment.snapshot() is default
+        with si.using("test_definitions"):
+            assert repr(N * m) == "1.000 N·m"
+        assert repr(N * m) == "1.000 J"
+    assert repr(N * m) == "1.000 N·m"
+    assert "J" not in vars(si)
+
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def calc(env_name):
+        with si.using(env_name):
+            barrier.wait()
+            results[env_name] = repr(N * m)
+            barrier.wait()
+
+    threads = [
+        threading.Thread(target=calc, args=(name,))
+        for name in ("default", "test_definitions")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {"default": "1.000 J", "test_definitions": "1.000 N·m"}
+
+
+def test_bench():
+    from forallpeople import bench
+
+    try:
+        report = bench.run(["test_definitions"], min_time=0.0001)
+    finally:
+        si.environment("test_definitions", top_level=True)
+    cases = {(result["environment"], result["case"]) for result in report["results"]}
+    assert ("test_definitions", "/ (reduced)") in cases
+    assert ("dimensions", "Dimensions.add") in cases
+    assert all(result["ops_per_sec"] > 0 for result in report["results"])
+    table = bench.format_results(report, baseline=report)
+    assert "1.00x" in table
+
+
+def test_profile():
+    mul = si.Physical.__mul__
+    dims_quotient = phf._dims_quotient
+    si.environment.cache_clear()
+    with si.profile() as profiler:
+        assert si.Physical.__mul__ is not mul
+        for _ in range(3):
+            kN * m
+        repr(kN * m)
+    assert si.Physical.__mul__ is mul
+    assert phf._dims_quotient is dims_quotient
+    snapshot = profiler.snapshot()
+    assert snapshot["Physical.__mul__"]["calls"] == 4
+    assert snapshot["Physical.__mul__"]["seconds"] > 0
+    assert snapshot["phf._powers_of_derived"]["calls"] == 1
+    assert snapshot["phf._get_units_by_factor"]["misses"] >= 4
+    assert "Physical.__repr__" in profiler.format()
+
+    kN * m
+    assert profiler.snapshot() == snapshot
+
+
+def test_parse():
+    parse = si.Physical.parse
+    assert parse("12.5 kN/m²") == 12.5 * kN / m ** 2
+    assert parse("12.5kN/m^2") == parse("12.5 kN/m**2") == parse("12.5 kN*m⁻²")
+    assert parse("3 kip·ft") == 3 * kipft
+    assert repr(parse("3 kip·ft")) == "3.000 kip·ft"
+    assert parse("2 kg m² s⁻²") == 2 * N * m
+    assert parse("10 (kN*m)/m") == 10 * kN
+    assert parse("7 1/s") == 7 / s
+    assert parse("5 mm") == 5 * mm
+    assert parse("3 µm") == parse("3 μm") == 3e-6 * m
+    assert parse("100 mg") == 1e-4 * kg
+    assert parse("-2.5e3 N") == -2.5 * kN
+    assert parse("2 psi") == 2 * psi
+    assert parse("1 m/m") == 1.0
+    assert parse("5") == 5.0
+    for text in ["kN", "3 foo", "3 kN/", "3 (m", "3 m**"]:
+        with pytest.raises(ValueError):
+            parse(text)
+
+
+def test_parse_cache(monkeypatch):
+    si.parse("1 kN/m")
+    compiled = si.environment.snapshot()
+    unit = compiled.parse_cache["kN/m"]
+    assert si.parse("2 kN/m") == 2 * unit
+    with si.using("default"):
+        assert "kN/m" not in si.environment.snapshot().parse_cache
+        assert repr(si.parse("2 kN·m")) == "2.000 kJ"
+        si.environment.cache_clear()
+        assert not si.environment.snapshot().parse_cache
+        monkeypatch.setattr("forallpeople.parsing._MAX_CACHE_ENTRIES", 0)
+        assert repr(si.parse("2 kN·m")) == "2.000 kJ"
+        assert not si.environment.snapshot().parse_cache
+
+
+def test_parse_column():
+    np = pytest.importorskip("numpy")
+    import io
+
+    csv_file = io.StringIO("id,load\n0,3.2 kip\n1,410 psf\n2,\n3,5 kip\n4,2\n5,1 m\n6,3 mm\n")
+    groups = list(si.parse_column(csv_file, column=1, header=True, chunk_size=4))
+    rows = [group.rows.tolist() for group in groups]
+    assert rows == [[0, 3], [1], [4], [5, 6]]
+    assert groups[0].values[1] == 5 * kip
+    assert repr(groups[0].values) == "PhysicalArray([3.200 kip, 5.000 kip])"
+    assert groups[1].values[0] == 410 * psf
+    assert groups[2].values.tolist() == [2.0]
+    assert groups[3].values[1] == 3 * mm
+
+    groups = list(si.parse_column(["1 kN", "2 kN", "3 kN"]))
+    assert len(groups) == 1 and groups[0].values[2] == 3 * kN
+    with pytest.raises(ValueError, match="Row 1"):
+        list(si.parse_column(["1 kN", "2 foo"]))
+
+
+def test_physical_pandas():
+    pd = pytest.importorskip("pandas")
+    import io
+    from forallpeople.physical_pandas import PhysicalDtype, PhysicalExtensionArray
+
+    loads = pd.Series([1.5, 2.0, None, 4.0], dtype="physical[kN]")
+    assert loads.dtype == PhysicalDtype("kN") == "physical[kN]"
+    assert loads.dtype != PhysicalDtype("N") and PhysicalDtype("mm") != "physical[m]"
+    assert loads[0] == 1.5 * kN and pd.isna(loads[2])
+    assert loads.sum() == 7.5 * kN
+    assert loads[2:3].sum() == 0 * kN and pd.isna(loads[2:3].sum(min_count=1))
+    assert loads.sum(min_count=3) == 7.5 * kN and pd.isna(loads.sum(min_count=4))
+    assert loads.mean() == 2.5 * kN
+    assert loads.max() == 4 * kN
+    assert (loads * 2).dtype == loads.dtype
+    assert (loads / m)[3] == 4 * kN / m
+    assert (loads > 1.8 * kN).tolist() == [False, True, False, True]
+    assert loads[loads > 1.8 * kN].tolist() == [2 * kN, 4 * kN]
+    assert loads.to_numpy(dtype=float)[:2].tolist() == [1.5, 2.0]
+    newtons = loads.astype("physical[N]")
+    assert newtons.to_numpy(dtype=float)[:2].tolist() == [1500, 2000]
+    assert newtons[0] == loads[0]
+    with pytest.raises(ValueError):
+        loads + pd.Series([1.0, 1.0, 1.0, 1.0], dtype="physical[m]")
+
+    frame = pd.DataFrame({"group": ["a", "b", "a", "b"], "load": loads})
+    sums = frame.groupby("group")["load"].sum()
+    assert sums.dtype == loads.dtype
+    assert sums.tolist() == [1.5 * kN, 6 * kN]
+    assert frame.groupby("group")["load"].mean().tolist() == [1.5 * kN, 3 * kN]
+
+    kips = pd.Series([3 * kip, 4 * kip], dtype="physical")
+    assert kips.dtype.name == "physical[kip]"
+    assert repr(kips[0]) == "3.000 kip"
+    moments = kips.array * (2 * ft)
+    assert moments.dtype == PhysicalDtype(kip * ft)
+    assert moments.to_numpy(dtype=float) == pytest.approx([6, 8])
+    array = si.PhysicalArray.from_physicals([1 * kip, 2 * kip])
+    column = PhysicalExtensionArray._from_sequence(array)
+    assert column.dtype == "physical[kip]"
+    assert column.to_numpy(dtype=float) == pytest.approx([1, 2])
+    csv_file = io.StringIO("load\n3 kip\n5 kip\n")
+    frame = pd.read_csv(csv_file, dtype={"load": "physical[kip]"})
+    assert frame["load"].tolist() == [3 * kip, 5 * kip]
+
+
+def test_physical_arrow(tmp_path):
+    np = pytest.importorskip("numpy")
+    pa = pytest.importorskip("pyarrow")
+    pytest.importorskip("pyarrow.parquet")
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    from forallpeople.physical_arrow import PhysicalArrowType, from_arrow
+
+    loads = si.PhysicalArray(np.arange(5.0) * 1e3, kip.dimensions, kip.factor, 2)
+    array = loads.to_arrow()
+    assert isinstance(array.type, PhysicalArrowType)
+    assert np.shares_memory(si.PhysicalArray.from_arrow(array).value, loads.value)
+    with pytest.raises(TypeError):
+        from_arrow(pa.array([1.0, 2.0]))
+
+    pq.write_table(pa.table({"load": array}), tmp_path / "loads.parquet")
+    table = pq.read_table(tmp_path / "loads.parquet")
+    read = si.PhysicalArray.from_arrow(table["load"])
+    assert (read.dimensions, read.factor, read.precision) == (
+        kip.dimensions,
+        kip.factor,
+        2,
+    )
+    assert read.tolist() == loads.tolist()
+
+    with pa.OSFile(str(tmp_path / "loads.arrow"), "wb") as file:
+        with pa.ipc.new_file(file, pa.schema([("load", array.type)])) as writer:
+            writer.write_table(pa.table({"load": array}))
+    with pa.memory_map(str(tmp_path / "loads.arrow")) as source:
+        mapped = from_arrow(pa.ipc.open_file(source).read_all()["load"])
+        assert not mapped.value.flags.owndata  # A view of the mapped file
+        assert mapped.tolist() == loads.tolist()
+
+
+def test_physical_pandas_arrow(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow.parquet")
+    import forallpeople.physical_pandas
+
+    frame = pd.DataFrame({"load": pd.Series([1.5, None, 3.0], dtype="physical[kip]")})
+    frame.to_parquet(tmp_path / "loads.parquet")
+    read = pd.read_parquet(tmp_path / "loads.parquet")
+    assert read["load"].dtype == frame["load"].dtype
+    assert read["load"][0] == 1.5 * kip and pd.isna(read["load"][1])
+
+
+def test_rational_exponents():
+    from fractions import Fraction
+    from forallpeople.dimensions import rational_exponent
+
+    assert rational_exponent(1 / 3) == Fraction(1, 3)
+    assert rational_exponent(2.5) == Fraction(5, 2)
+    assert type(rational_exponent(2.0)) is int
+    assert rational_exponent(0.123456789) == 0.123456789
+    assert si.Dimensions(0, Fraction(3, 3), 0, 0, 0, 0, 0) is m.dimensions
+    assert (m ** Fraction(1, 3)).dimensions.m == Fraction(1, 3)
+
+    tenth = m ** 0.1
+    assert (tenth ** 10).dimensions.m == 1.0
+    si.rational_exponents()
+    try:
+        tenth = m ** 0.1
+        product = tenth
+        for _ in range(9):
+            product = product * tenth
+        assert product.dimensions is m.dimensions
+        assert (m ** 3).sqrt(3).dimensions is m.dimensions
+        assert repr(tenth) == "1.000 m⁰'¹"
+        assert repr(kg * m ** 2.5) == "1.000 kg·m²'⁵"
+    finally:
+        si.rational_exponents(False)
+
+
+def test_unchecked():
+    import threading
+
+    def calculate():
+        w = 2.5 * kip / ft
+        length = 12 * ft
+        moment = w * length ** 2 / 8
+        stress = moment / (30 * inch ** 3)
+        results = [
+            moment,
+            stress,
+            w * length - 1 * kip,
+            3 - moment / moment,
+            (1 * kN + 1000 * N) / (2 * N),
+            -stress,
+            2 * N * m / m,
+        ]
+        return [getattr(result, "repr", result) for result in results] + [
+            stress > 1 * MPa,
+            moment == moment,
+            1 * kN <= 999.9 * N,
+            kN == "kN",
+        ]
+
+    from forallpeople import unchecked_mode
+
+    checked = calculate()
+    with si.unchecked():
+        with si.unchecked():
+            assert calculate() == checked
+        assert unchecked_mode.is_enabled()
+        assert calculate() == checked
+        assert (kN + m).value == kN.value + m.value  # Not caught
+        in_thread = []
+        thread = threading.Thread(target=lambda: in_thread.append(calculate()))
+        thread.start()
+        thread.join()
+        assert in_thread == [checked]
+
+        def add_in_thread():
+            with pytest.raises(ValueError):
+                kN + m
+            in_thread.append("checked")
+
+        thread = threading.Thread(target=add_in_thread)
+        thread.start()
+        thread.join()
+        assert in_thread == [checked, "checked"]
+    assert not unchecked_mode.is_enabled()
+    assert calculate() == checked  # With the units cached by si.unchecked()
+    with pytest.raises(ValueError):
+        kN + m
+    with pytest.raises(RuntimeError):
+        with si.unchecked():
+            raise RuntimeError
+    assert not unchecked_mode.is_enabled()
+
+
+def test_compile_formula():
+    np = pytest.importorskip("numpy")
+    moment = si.compile_formula("w * L**2 / 8", w="kip/ft", L="ft")
+    assert moment.inputs == ("w", "L")
+    assert moment(2.5, 12).repr == (2.5 * kip / ft * (12 * ft) ** 2 / 8).repr
+    assert moment(L=12, w=2.5) == moment(2.5, 12)
+    assert moment(2 * kN / m, 3 * m) == 2 * kN / m * (3 * m) ** 2 / 8
+    results = moment(np.array([1.0, 2.0]), np.array([10.0, 20.0]))
+    assert isinstance(results, si.PhysicalArray)
+    assert list(results) == [moment(1, 10), moment(2, 20)]
+    stress = si.compile_formula(lambda P, A: P / A / 2, P="kN", A=mm ** 2)
+    assert stress(5, 10) == 5 * kN / (10 * mm ** 2) / 2
+    ratio = si.compile_formula("x / 2 + 1", x=None)
+    assert ratio(4) == 3
+    with pytest.raises(ValueError):
+        si.compile_formula("w + L", w="kip", L="ft")
+    with pytest.raises(ValueError):
+        si.compile_formula("w + 3", w="kip")
+    with pytest.raises(ValueError):
+        si.compile_formula(lambda P, A: P / A + 1 * MPa, P="kN", A=mm ** 2)
+    for formula in ["__import__('os')", "w.__class__", "().__class__", "w[0]", "'w'"]:
+        with pytest.raises(ValueError):
+            si.compile_formula(formula, w="kip")
+    with pytest.raises(ValueError):
+        moment(2 * kN, 3 * m)
+    with pytest.raises(TypeError):
+        moment(2.5)
+
+
+def test_sorted():
+    loads = [3 * kN, 1 * kip, 2.5 * kN, 1000.0000001 * N, 1 * kN]
+    assert si.sort_physicals(loads) == sorted(loads)
+    assert si.sort_physicals(loads, reverse=True) == sorted(loads, reverse=True)
+    assert si.argsort(loads) == [3, 4, 2, 0, 1]
+    assert si.sort_key(1000.0000001 * N) == si.sort_key(kN)
+    assert si.sort_physicals(["b", "a"]) == ["a", "b"]
+    namespace = {}
+    exec("from forallpeople import *", namespace)
+    assert "sorted" not in namespace and "compile" not in namespace
+    assert si.sort_physicals(loads, key=lambda load: -load.value)[0] == kip
+    with pytest.raises(ValueError):
+        si.sort_physicals([kN, m])
+
+
+def test_isclose():
+    assert si.isclose(1000.0000001 * N, kN)
+    assert not si.isclose(1.01 * kN, kN)
+    assert si.isclose(1.01 * kN, kN, rel_tol=0.02)
+    assert si.isclose(1.01 * kN, kN, abs_tol=20 * N)
+    assert si.isclose([kN, 2 * kN], kN) == [True, False]
+    assert si.isclose([kN, 2 * kN], [1000 * N, 2000 * N]) == [True, True]
+    with pytest.raises(ValueError):
+        si.isclose(kN, m)
+    with pytest.raises(ValueError):
+        si.isclose([kN, m], kN)
+
+
+def test_sorted_array():
+    np = pytest.importorskip("numpy")
+    loads = si.PhysicalArray(np.array([3.0, 1.0, 2.0, 1.0000000001]), N.dimensions)
+    assert si.argsort(loads).tolist() == [1, 3, 2, 0]
+    assert si.argsort(loads, reverse=True).tolist() == [0, 2, 1, 3]
+    assert si.sort_physicals(loads).tolist() == sorted(loads.tolist())
+    assert si.isclose(loads, N).tolist() == [False, True, False, True]
+
+
+def test_pickle():
+    import copy
+
+    loads = [i * kN for i in range(100)] + [i * kip for i in range(100)]
+    data = pickle.dumps(loads)
+    assert pickle.loads(data) == loads
+    assert pickle.loads(data)[150].factor == kip.factor
+    assert data.count(b"forallpeople") == 2  # Unit descriptors are memoized
+    assert len(data) < 25 * len(loads)
+    assert copy.deepcopy(kipft) == kipft
+    assert repr(pickle.loads(pickle.dumps(kipft))) == "1.000 kip·ft"
+
+
+def test_physical_array_pickle():
+    np = pytest.importorskip("numpy")
+    array = si.PhysicalArray(np.arange(1000.0), kN.dimensions)
+    buffers = []
+    data = pickle.dumps(array, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1 and len(data) < 1000
+    unpickled = pickle.loads(data, buffers=buffers)
+    assert unpickled.dimensions == array.dimensions
+    assert np.array_equal(unpickled.value, array.value)
+
+
+def test__eval_factor():
+    func = _eval_factor
+    assert func("0.3048**2/12**2/0.45359237/9.80665") == eval(
+        "0.3048**2/12**2/0.45359237/9.80665"
+    )
+    assert func("1/3600/24") == 1 / 3600 / 24
+    assert func("-(2 + 3) * 4") == -20
+    assert func("1000") == 1000 and type(func("1000")) is int
+    assert func("1e-3") == 0.001
+    assert func("2**1000") == 2 ** 1000
+    for expr in ["__import__('os')", "2 if 1 else 3", "True", "1/0", "9**9**9", ""]:
+        with pytest.raises(ValueError):
+            func(expr)
+    with pytest.raises(ValueError):
+        func("((10**1000)**1000)**20")
+
+
+## Tests of PhysicalArray ##
+
+
+def test_physical_array_arithmetic():
+    np = pytest.importorskip("numpy")
+    a = si.PhysicalArray([1000.0, 2000.0, 3000.0], kN.dimensions)
+    assert a[1] == 2 * kN
+    assert (a + kN)[0] == 2 * kN
+    assert (kN + a)[2] == 4 * kN
+    assert (a - kN)[0] == 0
+    assert (a * 2)[1] == 4 * kN
+    assert (a * m)[0] == kN * m
+    assert (m * a)[0] == kN * m
+    assert (a / m / m)[0] == kPa
+    assert (a ** 2)[2] == (3 * kN) ** 2
+    assert (2 / a)[0] == 2 / kN
+    assert np.allclose(a / kN, [1, 2, 3])
+    assert (a * ft).factor == (kN * ft).factor
+    with pytest.raises(ValueError):
+        a + m
+
+
+def test_physical_array_comparisons():
+    np = pytest.importorskip("numpy")
+    a = si.PhysicalArray([1000.0, 2000.0, 3000.0], kN.dimensions)
+    assert list(a > 1.5 * kN) == [False, True, True]
+    assert list(1.5 * kN < a) == [False, True, True]
+    assert list(a == 2 * kN) == [False, True, False]
+    with pytest.raises(ValueError):
+        a > 1 * m
+
+
+def test_physical_array_from_physicals():
+    pytest.importorskip("numpy")
+    a = si.PhysicalArray.from_physicals([1 * ft, 2 * ft])
+    assert a.factor == ft.factor
+    assert repr(a) == "PhysicalArray([1.000 ft, 2.000 ft])"
+    assert a.tolist() == [1 * ft, 2 * ft]
+    with pytest.raises(ValueError):
+        si.PhysicalArray.from_physicals([1 * ft, 2 * kg])
+
+
+def test_physical_array_ufuncs():
+    np = pytest.importorskip("numpy")
+    a = si.PhysicalArray([1000.0, 4000.0, 9000.0], kN.dimensions)
+    assert np.sqrt(a)[1] == (4 * kN).sqrt()
+    assert np.sum(a) == 14 * kN
+    assert np.add.reduce(a) == 14 * kN
+    assert np.mean(a).factor == kN.factor
+    assert np.max(a) == 9 * kN
+    assert list(np.maximum(a, 2 * kN).value) == [2000, 4000, 9000]
+    assert np.dot(a, a) == np.sum(a * a)
+    assert np.var(a).dimensions == (kN ** 2).dimensions
+    assert list(np.argsort(-a)) == [2, 1, 0]
+    assert np.concatenate([a, a]).shape == (6,)
+    assert np.allclose(a, a)
+    with pytest.raises(ValueError):
+        np.maximum(a, 2 * m)
+    with pytest.raises(TypeError):
+        np.exp(a)
+
+
+def test_physical_numpy_dispatch():
+    np = pytest.importorskip("numpy")
+    assert isinstance(np.array([1.0, 2.0]) * m, si.PhysicalArray)
+    assert isinstance(m * np.array([1.0, 2.0]), si.PhysicalArray)
+    assert (np.array([1.0, 2.0]) / s)[1] == 2 / s
+    assert np.sqrt(9 * kPa) == (9 * kPa).sqrt()
+    assert np.float64(2.0) * m == 2 * m
+    objects = np.array([[1 * ft, 2 * ft], [3 * ft, 4 * ft]], dtype=object)
+    a = si.PhysicalArray.from_physicals(objects)
+    assert a.shape == (2, 2) and a.factor == ft.factor
+    assert np.sum(a) == 10 * ft
+
+
+def test_physical_numpy_object_arrays():
+    np = pytest.importorskip("numpy")
+    loads = np.array([1 * kN, 2 * kN], dtype=object)
+    for result in (loads * m, m * loads, np.dot(loads, m)):
+        assert isinstance(result, si.PhysicalArray)  # Converted once
+        assert [repr(r) for r in result] == ["1.000 kN·m", "2.000 kN·m"]
+    assert [repr(r) for r in loads + 1 * kN] == ["2.000 kN", "3.000 kN"]
+    assert list(loads > 1.5 * kN) == [False, True]
+    array = si.PhysicalArray.from_physicals(loads)
+    assert [repr(r) for r in array * loads] == ["1.000 kN²", "4.000 kN²"]
+    with pytest.raises(ValueError):
+        loads + 1 * m
+    mixed = np.array([1 * kN, 2 * m], dtype=object)
+    for result in (mixed * m, np.dot(mixed, m)):
+        assert result.dtype == object  # Computed element by element
+        assert [repr(r) for r in result] == ["1.000 kN·m", "2.000 m²"]
+    prefixed = (5 * kN).prefix("M")
+    assert repr(np.int64(2) * prefixed) == repr(2 * prefixed) == "0.010 MN"
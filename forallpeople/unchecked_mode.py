@@ -0,0 +1,82 @@
+#   Copyright 2020 Connor Ferster
+
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+
+#        http://www.apache.org/licenses/LICENSE-2.0
+
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+A trusted "unchecked" arithmetic mode for hot inner loops whose operands are
+known to be dimensionally consistent:
+
+    with si.unchecked():
+        for load in loads:
+            total = total + load * lever_arm
+
+While it is on, the units of a product or quotient of Physicals are worked out
+once per pair of operand units (with the checked operator) and then looked up,
+so results are identical to the checked mode as long as the operands are
+consistent. (Checked code looks up the same units, once they are cached, but
+never adds to them.) Dimension mismatches are NOT caught: adding quantities of
+different dimensions takes the units of the left operand, and comparing them
+compares their values.
+
+The mode is held in a context variable (like si.using()), so it applies only
+to the thread or asyncio task that entered si.unchecked().
+"""
+
+import contextlib
+
+from forallpeople import Physical, environment, _unchecked
+from forallpeople.si_environment import _MAX_CACHE_ENTRIES
+
+# The checked operators used to work out the units of results
+_OPERATORS = {"*": Physical.__mul__, "/": Physical.__truediv__}
+
+
+def is_enabled() -> bool:
+    """
+    Returns True if the unchecked mode is on in the current thread or task.
+    """
+    return _unchecked.get()
+
+
+@contextlib.contextmanager
+def unchecked():
+    """
+    Returns a context manager that switches the unchecked mode on in the
+    current thread or asyncio task for the duration of the block. Blocks may
+    be nested.
+    """
+    token = _unchecked.set(True)
+    try:
+        yield
+    finally:
+        _unchecked.reset(token)
+
+
+def _unchecked_result(operation: str, physical: Physical, other: Physical):
+    """
+    Returns the result of 'operation' ("*" or "/") on the Physicals, 'physical'
+    and 'other', computed with the checked operator, and caches its units (None
+    if the result is dimensionless) in the current environment for their pair of
+    units. Called by Physical.__mul__ and .__truediv__ in the unchecked mode when
+    the pair of units is not cached yet; once it is, they look its units up.
+    """
+    token = _unchecked.set(False)
+    try:
+        result = _OPERATORS[operation](physical, other)
+    finally:
+        _unchecked.reset(token)
+    cache = environment.snapshot().unchecked_cache
+    if len(cache) < _MAX_CACHE_ENTRIES:
+        unit = result._unit if isinstance(result, Physical) else None
+        cache[operation, physical._unit, other._unit] = unit
+    return result
@@ -17,7 +17,7 @@ DESCRIPTION = 'SI units library for daily calculation work.'
 URL = 'https://github.com/connorferster/forallpeople'
 EMAIL = 'connorferster@gmail.com'
 AUTHOR = 'Connor Ferster'
-REQUIRES_PYTHON = '>=3.6.0'
+REQUIRES_PYTHON = '>=3.7.0'
 VERSION = '1.2.0'
 
 # What packages are required for this module to be executed?
@@ -28,6 +28,9 @@ REQUIRED = [
 # What packages are optional?
 EXTRAS = {
     # 'fancy feature': ['django'],
+    'numpy': ['numpy'],
+    'pandas': ['numpy', 'pandas'],
+    'arrow': ['numpy', 'pyarrow'],
 }
 
 # The rest you shouldn't have to touch too much :)